@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+""" This script computes several statistics of a snapshot in a single pass, see lib/aggregate.py.
+    Namely, one CSV file per selected aggregator is created in the given --target-folder. """
+
+import os
+import copy
+import argparse
+import functools
+import multiprocessing
+
+import progressbar
+
+from parse_chunk_file import parse_chunk_file
+from parse_snapshot import get_chunk_filenames, iter_snapshot
+from lib import aggregate
+
+
+def aggregate_chunk_files(chunk_filenames, aggregators, is_obfuscated_snapshot=False):
+    """ Feeds the given chunk files to copies of the given (empty) aggregators and returns the copies. """
+    aggregators = copy.deepcopy(aggregators)
+    for chunk_filename in chunk_filenames:
+        chunk_height, chunk_offset, _, utxos = parse_chunk_file(chunk_filename, is_obfuscated_snapshot=is_obfuscated_snapshot)
+        aggregate.update_aggregators(aggregators, chunk_height, chunk_offset, utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    return aggregators
+
+
+def aggregate_snapshot(folder, snapshot_height, aggregators, is_obfuscated_snapshot=False, jobs=1):
+    """ Feeds all chunks of a snapshot to the given aggregators in a single pass and returns the merged aggregators. """
+    filenames = get_chunk_filenames(folder, snapshot_height)
+    if jobs > 1:
+        # Each task covers a contiguous range of chunks, a few tasks per worker keep the load balanced
+        num_tasks = min(len(filenames), 4 * jobs)
+        tasks = [filenames[(i * len(filenames) // num_tasks):((i + 1) * len(filenames) // num_tasks)] for i in range(num_tasks)]
+        bar = progressbar.ProgressBar(max_value=len(tasks), redirect_stdout=True)
+        # Tasks are pickled lazily, hence workers get a copy of the empty aggregators that is not merged into
+        worker = functools.partial(aggregate_chunk_files, aggregators=copy.deepcopy(aggregators), is_obfuscated_snapshot=is_obfuscated_snapshot)
+        with multiprocessing.Pool(jobs) as pool:
+            for i, partial_aggregators in enumerate(pool.imap_unordered(worker, tasks)):
+                aggregators = aggregate.merge_aggregators(aggregators, partial_aggregators)
+                bar.update(i)
+    else:
+        bar = progressbar.ProgressBar(max_value=len(filenames), redirect_stdout=True)
+        chunks = iter_snapshot(folder, snapshot_height, is_obfuscated_snapshot=is_obfuscated_snapshot, filenames=filenames)
+        for i, (chunk_height, chunk_offset, _, utxos) in enumerate(chunks):
+            aggregate.update_aggregators(aggregators, chunk_height, chunk_offset, utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+            bar.update(i)
+    return aggregators
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to analyse')
+    argparser.add_argument('--aggregator', type=str, action='append', choices=sorted(aggregate.AGGREGATORS), help='Aggregator to compute, can be repeated (default: all)')
+    argparser.add_argument('--target-folder', type=str, help='Target folder for output', default='.')
+    argparser.add_argument('--target-prefix', type=str, help='Prefix of output file', default='utxo_stats_')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing an obfuscated snapshot')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes parsing chunks in parallel', default=1)
+    args = argparser.parse_args()
+
+    names = args.aggregator if args.aggregator is not None else list(aggregate.AGGREGATORS)
+    aggregators = [aggregate.AGGREGATORS[name]() for name in names]
+    aggregators = aggregate_snapshot(args.folder, args.snapshot_height, aggregators, is_obfuscated_snapshot=args.obfuscated_snapshot, jobs=args.jobs)
+
+    for aggregator in aggregators:
+        with open(os.path.join(args.target_folder, f'{args.target_prefix}{args.snapshot_height:010d}_{aggregator.name}.csv'), 'w') as f:
+            aggregate.print_aggregator(aggregator, f)
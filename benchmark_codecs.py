@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+""" This script benchmarks the VARINT and compact int codecs of lib/base.py against their former implementations on
+    random values and checks that both yield the same results. """
+
+import io
+import sys
+import time
+import random
+import struct
+import argparse
+
+from lib import base
+
+
+def read_varint_file_former(file_handler):
+    n = 0
+    while True:
+        b = file_handler.read(1)
+        b = struct.unpack('B', b)[0]
+        n = (n << 7) | (b & 0x7F)
+        if b & 0x80:
+            n += 1
+        else:
+            return n
+
+
+def write_varint_former(n):
+    res = b''
+    n = int(n)
+    length = 0
+    while True:
+        res += struct.pack('<B', (n & 0x7F) | (0x80 if length else 0x00))
+        if n <= 0x7F:
+            break
+        n = (n >> 7) - 1
+        length += 1
+    return res[::-1]
+
+
+def read_compact_int_file_former(file_handler, offset):
+    """ The former implementation of base.read_compact_int_file for a given offset, returning only the int. """
+    res = base.read_charint(base.read_at_pos(file_handler, 1, offset))
+    if res == 253:
+        res = base.read_shortint(base.read_at_pos(file_handler, 2, offset + 1))
+    elif res == 254:
+        res = base.read_int(base.read_at_pos(file_handler, 4, offset + 1))
+    elif res == 255:
+        res = base.read_longint(base.read_at_pos(file_handler, 8, offset + 1))
+    return res
+
+
+def get_values(num_values, seed=0):
+    """ Returns random values of all VARINT lengths, biased towards small values as in snapshots. """
+    rng = random.Random(seed)
+    return [rng.getrandbits(rng.choice([7, 14, 21, 28, 35, 64])) for _ in range(num_values)]
+
+
+def get_time_per_value(func, num_values):
+    start = time.perf_counter()
+    res = func()
+    return res, 1e9 * (time.perf_counter() - start) / num_values
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--num-values', type=int, help='Number of random values', default=100000)
+    argparser.add_argument('--seed', type=int, help='Seed of the random values', default=0)
+    args = argparser.parse_args()
+
+    values = get_values(args.num_values, seed=args.seed)
+    n = len(values)
+    results = dict()
+
+    results['write_varint'] = [get_time_per_value(lambda w=w: [w(v) for v in values], n) for w in (write_varint_former, base.write_varint)]
+    data = b''.join(results['write_varint'][1][0])
+
+    def read_varints_file(read):
+        f = io.BytesIO(data)
+        return [read(f) for _ in range(n)]
+    results['read_varint_file'] = [get_time_per_value(lambda r=r: read_varints_file(r), n) for r in (read_varint_file_former, base.read_varint_file)]
+
+    # read_varints is new, hence it is compared with decoding the same VARINTs one by one
+    def read_varint_loop():
+        res = list()
+        offset = 0
+        for _ in range(n):
+            v, offset = base.read_varint(data, offset)
+            res.append(v)
+        return res
+    results['read_varints'] = [get_time_per_value(read_varint_loop, n), get_time_per_value(lambda: base.read_varints(data, n)[0].tolist(), n)]
+
+    # Compact ints are read at a fixed offset, as the number of UTXOs from a chunk header
+    headers = [io.BytesIO(bytes(8) + base.write_compact_int(v)) for v in values]
+    results['read_compact_int_file'] = [
+        get_time_per_value(lambda: [read_compact_int_file_former(f, 8) for f in headers], n),
+        get_time_per_value(lambda: [base.read_compact_int_file(f, offset=8)[0] for f in headers], n)]
+
+    is_identical = True
+    for name, ((res_former, time_former), (res, time_new)) in results.items():
+        is_identical &= res_former == res
+        print('{}: {:.0f} -> {:.0f} ns per value'.format(name, time_former, time_new))
+    is_identical &= results['read_varint_file'][1][0] == values
+    print('Identical results: {}'.format(is_identical))
+    sys.exit(0 if is_identical else 1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+""" This script checks that utxo.compress_value, utxo.decompress_value and their batch variants round-trip exactly over
+    the full amount range (0 to MAX_MONEY) and benchmarks them against the former floating-point implementation. """
+
+import sys
+import time
+import random
+import argparse
+from math import floor
+
+import numpy as np
+
+from lib import utxo
+
+
+def decompress_value_float(v):
+    """ The former implementation of utxo.decompress_value, which loses precision in floating-point divisions. """
+    if v == 0:
+        return 0
+    v -= 1
+    e = v % 10
+    v = int(floor(v / 10))
+    n = 0
+    if e < 9:
+        d = (v % 9) + 1
+        v = int(floor(v / 9))
+        n = v * 10 + d
+    else:
+        n = v + 1
+    while e > 0:
+        n *= 10
+        e -= 1
+    return n
+
+
+def compress_value_float(v):
+    """ The former implementation of utxo.compress_value, which loses precision in floating-point divisions. """
+    if v == 0:
+        return 0
+    e = 0
+    while ((v % 10) == 0) and e < 9:
+        v /= 10
+        e += 1
+    if e < 9:
+        d = v % 10
+        assert 1 <= d <= 9
+        v /= 10
+        return 1 + (((v * 9) + d - 1) * 10) + e
+    else:
+        return 1 + ((v - 1) * 10) + 9
+
+
+def get_amounts(num_amounts, seed=0):
+    """ Returns the edge amounts around all powers of ten up to MAX_MONEY, and random amounts with and without
+        trailing zeros. """
+    amounts = {0, 1, utxo.MAX_MONEY - 1, utxo.MAX_MONEY}
+    for e in range(16):
+        for d in range(1, 10):
+            amounts.update(v for v in [d * 10**e - 1, d * 10**e, d * 10**e + 1] if v <= utxo.MAX_MONEY)
+    rng = random.Random(seed)
+    amounts.update(rng.randint(0, utxo.MAX_MONEY) for _ in range(num_amounts // 2))
+    amounts.update(rng.randint(0, utxo.MAX_MONEY // 10**e) * 10**e for e in (rng.randint(1, 15) for _ in range(num_amounts // 2)))
+    return sorted(amounts)
+
+
+def get_time_per_amount(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return 1e9 * (time.perf_counter() - start) / len(args[0])
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--num-amounts', type=int, help='Number of random amounts', default=300000)
+    argparser.add_argument('--seed', type=int, help='Seed of the random amounts', default=0)
+    args = argparser.parse_args()
+
+    amounts = get_amounts(args.num_amounts, seed=args.seed)
+    compressed = [utxo.compress_value(v) for v in amounts]
+    is_exact = [utxo.decompress_value(c) for c in compressed] == amounts
+    is_batch_exact = utxo.compress_values(amounts).tolist() == compressed and utxo.decompress_values(compressed).tolist() == amounts
+    num_float_errors = sum(decompress_value_float(compress_value_float(v)) != v for v in amounts)
+
+    amounts_array = np.array(amounts, dtype=np.uint64)
+    compressed_array = np.array(compressed, dtype=np.uint64)
+    print('Amounts: {}'.format(len(amounts)))
+    print('compress_value (float): {:.0f} ns per amount'.format(get_time_per_amount(lambda a: [compress_value_float(v) for v in a], amounts)))
+    print('compress_value: {:.0f} ns per amount'.format(get_time_per_amount(lambda a: [utxo.compress_value(v) for v in a], amounts)))
+    print('compress_values: {:.0f} ns per amount'.format(get_time_per_amount(utxo.compress_values, amounts_array)))
+    print('decompress_value (float): {:.0f} ns per amount'.format(get_time_per_amount(lambda a: [decompress_value_float(c) for c in a], compressed)))
+    print('decompress_value: {:.0f} ns per amount'.format(get_time_per_amount(lambda a: [utxo.decompress_value(c) for c in a], compressed)))
+    print('decompress_values: {:.0f} ns per amount'.format(get_time_per_amount(utxo.decompress_values, compressed_array)))
+    print('Round trip exact: {}'.format(is_exact))
+    print('Batch variants identical: {}'.format(is_batch_exact))
+    print('Round trip errors of the float version: {}'.format(num_float_errors))
+    sys.exit(0 if is_exact and is_batch_exact else 1)
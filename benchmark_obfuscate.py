@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+""" This script benchmarks the per-payload cost of obfuscate.obfuscate_payload and obfuscate.obfuscate_payloads on
+    random payloads and checks that both yield the same commitments. """
+
+import os
+import time
+import argparse
+
+from lib import obfuscate
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--num-payloads', type=int, help='Number of random payloads', default=1000)
+    argparser.add_argument('--payload-size', type=int, help='Size of each payload in bytes', default=20)
+    argparser.add_argument('--batch-size', type=int, help='Number of payloads per call to obfuscate_payloads', default=1000)
+    args = argparser.parse_args()
+
+    payloads = [os.urandom(args.payload_size) for _ in range(args.num_payloads)]
+
+    start = time.perf_counter()
+    obfuscate.get_generator_table()
+    time_table = time.perf_counter() - start
+
+    start = time.perf_counter()
+    commitments_batch = list()
+    for i in range(0, len(payloads), args.batch_size):
+        commitments_batch += obfuscate.obfuscate_payloads(payloads[i:(i + args.batch_size)])
+    time_batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    commitments = [obfuscate.obfuscate_payload(p) for p in payloads]
+    time_single = time.perf_counter() - start
+
+    print('Precomputation: {:.3f} s'.format(time_table))
+    print('obfuscate_payload: {:.1f} us per payload'.format(1e6 * time_single / len(payloads)))
+    print('obfuscate_payloads: {:.1f} us per payload'.format(1e6 * time_batch / len(payloads)))
+    print('Identical commitments: {}'.format(commitments == commitments_batch))
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+""" This script builds the outpoint index of a snapshot, see lib/outpointindex.py and lookup_outpoint.py. """
+
+import argparse
+
+from parse_snapshot import get_chunk_filenames, iter_snapshot
+from lib import outpointindex
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to index')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are indexing an obfuscated snapshot')
+    args = argparser.parse_args()
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    chunks = iter_snapshot(args.folder, args.snapshot_height, is_obfuscated_snapshot=args.obfuscated_snapshot, filenames=filenames)
+    outpointindex.build_outpoint_index(args.folder, args.snapshot_height, filenames, chunks=chunks)
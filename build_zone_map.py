@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+""" This script builds the zone map of a snapshot in a single pass over all chunks, see lib/zonemap.py. """
+
+import argparse
+import functools
+import multiprocessing
+
+import progressbar
+
+from parse_snapshot import get_chunk_filenames, read_chunk_files
+from lib import chunk, zonemap
+
+
+def get_chunk_file_zone(chunk_filename, is_obfuscated_snapshot=False):
+    return zonemap.get_chunk_zone(chunk_filename, chunk.read_chunk_file(chunk_filename), is_obfuscated_snapshot=is_obfuscated_snapshot)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to index')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are indexing an obfuscated snapshot')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes parsing chunks in parallel', default=1)
+    args = argparser.parse_args()
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    bar = progressbar.ProgressBar(max_value=len(filenames), redirect_stdout=True)
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs)
+        worker = functools.partial(get_chunk_file_zone, is_obfuscated_snapshot=args.obfuscated_snapshot)
+        zones = pool.imap(worker, filenames)
+    else:
+        pool = None
+        zones = (zonemap.get_chunk_zone(f, data, is_obfuscated_snapshot=args.obfuscated_snapshot) for f, data in read_chunk_files(filenames))
+
+    zone_map = list()
+    for i, zone in enumerate(zones):
+        zone_map.append(zone)
+        bar.update(i)
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    zonemap.write_zone_map(zonemap.get_zone_map_filename(args.folder, args.snapshot_height), zone_map)
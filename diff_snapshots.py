@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+""" This script determines which UTXOs were created and spent between two snapshots.
+    Namely, this script creates two CSV files in the given --target-folder:
+
+    1. Delta CSV file containing one row per created (+) or spent (-) UTXO.
+    2. Summary CSV file containing the number and value of created and spent UTXOs per txout type.
+
+    Chunks with equal content in both snapshots are skipped without being parsed. Content hashes are taken from the
+    zone map of a snapshot if it exists (see build_zone_map.py), such that only differing chunks are read at all.
+    All other UTXOs are merged in outpoint order, as snapshots are written in this order, such that only a few chunks
+    are held in memory. """
+
+import os
+import argparse
+
+import numpy as np
+
+from parse_snapshot import get_chunk_filenames, read_chunk_files, iter_snapshot
+from lib import chunk, outpointindex, zonemap
+from lib import utxo as utxo_handler
+
+
+def get_content_hashes(folder, snapshot_height, filenames):
+    """ Returns the content hashes of the given chunk files, taken from the zone map of the snapshot if it exists.
+
+        Only if there is no zone map, or it does not match the chunk files (e.g., as chunks were rewritten since),
+        are the chunk files read and hashed. The zone map only matches if it has the same chunk files and sizes, and
+        no chunk file was modified after it was built. """
+    zone_map_filename = zonemap.get_zone_map_filename(folder, snapshot_height)
+    if os.path.exists(zone_map_filename):
+        # Content hashes do not depend on the classification of script types, hence any zone map will do
+        zone_map = zonemap.read_zone_map(zone_map_filename)
+        stats = [os.stat(f) for f in filenames]
+        zone_map_mtime = os.path.getmtime(zone_map_filename)
+        is_current = all(s.st_mtime <= zone_map_mtime for s in stats)
+        if is_current and zone_map['filename'].tolist() == [os.path.basename(f).encode() for f in filenames] and zone_map['chunk_size'].tolist() == [s.st_size for s in stats]:
+            return [h.decode() for h in zone_map['content_hash'].tolist()]
+    return [chunk.get_chunk_content_hash(data) for _, data in read_chunk_files(filenames)]
+
+
+def iter_utxo_batches(folder, snapshot_height, filenames, is_obfuscated_snapshot=False):
+    """ Yields one dict of (key, height, value, script_type) arrays per chunk, see outpointindex.get_outpoint_keys. """
+    last_key = None
+    for _, _, _, utxos in iter_snapshot(folder, snapshot_height, is_obfuscated_snapshot=is_obfuscated_snapshot, filenames=filenames):
+        keys = outpointindex.get_outpoint_keys(utxos.txid, utxos.vout)
+        if len(keys) == 0:
+            continue
+        if np.any(keys[1:] < keys[:-1]) or (last_key is not None and keys[0] < last_key):
+            raise ValueError(f'Snapshot {snapshot_height} is not in outpoint order')
+        last_key = keys[-1]
+        yield {
+            'key': keys,
+            'height': utxos.height,
+            'value': utxos.value,
+            'script_type': utxo_handler.classify_compressed_scripts(utxos.scripts, utxos.script_offsets, is_obfuscated_snapshot=is_obfuscated_snapshot),
+        }
+
+
+def split_batch(batch, n):
+    return {k: v[:n] for k, v in batch.items()}, {k: v[n:] for k, v in batch.items()}
+
+
+def select_batch(batch, mask):
+    return {k: v[mask] for k, v in batch.items()}
+
+
+def iter_diff(batches_old, batches_new):
+    """ Merges two streams of batches in outpoint order and yields (spent, created) batch pairs.
+
+        In each step, all pending UTXOs up to the smaller last key of both sides are compared. This consumes at least
+        one whole batch, such that at most two batches per side are held in memory. """
+    pending_old = pending_new = None
+    while True:
+        if pending_old is None or len(pending_old['key']) == 0:
+            pending_old = next(batches_old, None)
+        if pending_new is None or len(pending_new['key']) == 0:
+            pending_new = next(batches_new, None)
+        if pending_old is None and pending_new is None:
+            return
+
+        # Once one snapshot is exhausted, all remaining UTXOs of the other one are spent or created, respectively
+        if pending_old is None:
+            yield None, pending_new
+            pending_new = None
+            continue
+        if pending_new is None:
+            yield pending_old, None
+            pending_old = None
+            continue
+
+        bound = min(pending_old['key'][-1], pending_new['key'][-1])
+        part_old, pending_old = split_batch(pending_old, int(np.searchsorted(pending_old['key'], bound, side='right')))
+        part_new, pending_new = split_batch(pending_new, int(np.searchsorted(pending_new['key'], bound, side='right')))
+        yield (select_batch(part_old, ~np.isin(part_old['key'], part_new['key'])),
+               select_batch(part_new, ~np.isin(part_new['key'], part_old['key'])))
+
+
+def print_delta(batch, sign, file_out):
+    types = batch['script_type'].tolist()
+    for key, height, value, script_type in zip(batch['key'].tolist(), batch['height'].tolist(), batch['value'].tolist(), types):
+        # NumPy strips trailing null bytes of fixed-size bytes
+        key = key.ljust(36, b'\x00')
+        txid = utxo_handler.get_txid_hex(key[:32])
+        vout = int.from_bytes(key[32:36], byteorder='big')
+        label = utxo_handler.scripttype_labels[utxo_handler.ScriptType(script_type)][0]
+        print(f'{sign};{txid};{vout};{height};{value};{label}', file=file_out)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height_old', type=int, help='Block height of the older snapshot')
+    argparser.add_argument('snapshot_height_new', type=int, help='Block height of the newer snapshot')
+    argparser.add_argument('--folder-new', type=str, help='Folder holding the newer snapshot, if different', default=None)
+    argparser.add_argument('--target-folder', type=str, help='Target folder for output', default='.')
+    argparser.add_argument('--target-prefix', type=str, help='Prefix of output file', default='utxo_diff_')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing obfuscated snapshots')
+    args = argparser.parse_args()
+    folder_new = args.folder_new if args.folder_new is not None else args.folder
+
+    filenames_old = get_chunk_filenames(args.folder, args.snapshot_height_old)
+    filenames_new = get_chunk_filenames(folder_new, args.snapshot_height_new)
+    hashes_old = get_content_hashes(args.folder, args.snapshot_height_old, filenames_old)
+    hashes_new = get_content_hashes(folder_new, args.snapshot_height_new, filenames_new)
+    # Chunks with equal content hold the same UTXOs in both snapshots, hence they do not contribute to the difference
+    equal = set(hashes_old) & set(hashes_new)
+    filenames_old = [f for f, h in zip(filenames_old, hashes_old) if h not in equal]
+    filenames_new = [f for f, h in zip(filenames_new, hashes_new) if h not in equal]
+    print(f'Chunks skipped as equal: {len(equal)}')
+
+    batches_old = iter_utxo_batches(args.folder, args.snapshot_height_old, filenames_old, is_obfuscated_snapshot=args.obfuscated_snapshot)
+    batches_new = iter_utxo_batches(folder_new, args.snapshot_height_new, filenames_new, is_obfuscated_snapshot=args.obfuscated_snapshot)
+
+    num_types = utxo_handler.ScriptType.OTHER + 1
+    summary = {k: np.zeros(num_types, dtype=object) for k in ['created', 'spent', 'created_value', 'spent_value']}
+    prefix = f'{args.target_folder}/{args.target_prefix}{args.snapshot_height_old:010d}_{args.snapshot_height_new:010d}'
+    with open(f'{prefix}_delta.csv', 'w') as f_delta:
+        print('change;txid;tx_index;block_height;value;script_type', file=f_delta)
+        for spent, created in iter_diff(batches_old, batches_new):
+            for name, batch, sign in [('spent', spent, '-'), ('created', created, '+')]:
+                if batch is None or len(batch['key']) == 0:
+                    continue
+                print_delta(batch, sign, f_delta)
+                summary[name] += np.bincount(batch['script_type'], minlength=num_types)
+                summary[f'{name}_value'] += np.bincount(batch['script_type'], weights=batch['value'], minlength=num_types).astype(np.int64)
+
+    with open(f'{prefix}_summary.csv', 'w') as f_summary:
+        print('script_type;created;spent;created_value;spent_value;net_value', file=f_summary)
+        for k in utxo_handler.ScriptType._member_names_:
+            t = utxo_handler.ScriptType[k]
+            created, spent = summary['created'][t], summary['spent'][t]
+            created_value, spent_value = summary['created_value'][t], summary['spent_value'][t]
+            print(f'{utxo_handler.scripttype_labels[t][0]};{created};{spent};{created_value};{spent_value};{created_value - spent_value}', file=f_summary)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+""" This script estimates the number of distinct script payloads and the top script payloads by number of UTXOs and
+    by value of a snapshot, using mergeable sketches of bounded size (see lib/sketch.py). """
+
+import os
+import argparse
+
+from aggregate_snapshot import aggregate_snapshot
+from parse_snapshot import get_chunk_filenames
+from lib import aggregate, chunk
+
+
+def get_cpu_time():
+    """ Returns the CPU time of this process and all of its terminated worker processes in seconds. """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to analyse')
+    argparser.add_argument('--error', type=float, help='Relative standard error of the distinct count', default=0.01)
+    argparser.add_argument('--epsilon', type=float, help='Maximum overestimation of top payloads, relative to the total', default=1e-5)
+    argparser.add_argument('--delta', type=float, help='Probability of exceeding the maximum overestimation', default=0.01)
+    argparser.add_argument('--top-k', type=int, help='Number of top payloads to report', default=20)
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing an obfuscated snapshot')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes parsing chunks in parallel', default=1)
+    args = argparser.parse_args()
+
+    num_utxos = sum(chunk.read_num_utxos_files(get_chunk_filenames(args.folder, args.snapshot_height)))
+
+    cpu_time = get_cpu_time()
+    aggregators = [aggregate.DistinctPayloads(error=args.error), aggregate.TopPayloads(k=args.top_k, epsilon=args.epsilon, delta=args.delta)]
+    distinct, top = aggregate_snapshot(args.folder, args.snapshot_height, aggregators, is_obfuscated_snapshot=args.obfuscated_snapshot, jobs=args.jobs)
+    cpu_time = get_cpu_time() - cpu_time
+
+    (num_distinct, error), = distinct.finalize()
+    print('Number UTXOs: {}'.format(num_utxos))
+    print('Distinct payloads: {} (relative standard error {:.4f})'.format(num_distinct, error))
+    for by, rank, payload, estimate, max_error in top.finalize():
+        print('Top {} by {}: {} {} (+0/-{})'.format(rank, by, payload, estimate, max_error))
+    print('CPU seconds per million UTXOs: {:.2f}'.format(1e6 * cpu_time / max(num_utxos, 1)))
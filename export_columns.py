@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+""" This script exports a snapshot into memory-mappable column files, see lib/columns.py. """
+
+import argparse
+
+from parse_snapshot import get_chunk_filenames, iter_snapshot
+from lib import columns
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to export')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are exporting an obfuscated snapshot')
+    args = argparser.parse_args()
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    chunks = iter_snapshot(args.folder, args.snapshot_height, is_obfuscated_snapshot=args.obfuscated_snapshot, filenames=filenames)
+    num_utxos = columns.export_columns(args.folder, args.snapshot_height, filenames, is_obfuscated_snapshot=args.obfuscated_snapshot, chunks=chunks)
+    print('Exported UTXOs: {}'.format(num_utxos))
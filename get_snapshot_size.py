@@ -7,6 +7,8 @@ import argparse
 import logging
 import glob
 
+from lib import zonemap
+
 
 DEBUG = False
 
@@ -23,13 +25,19 @@ if __name__ == '__main__':
     argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
     argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to extract')
     argparser.add_argument('--opreturn', action='store_true', help='Application data storage instead of snapshot')
+    argparser.add_argument('--zone-map', action='store_true', help='Take the chunk sizes from the zone map instead of all chunk files')
     args = argparser.parse_args()
 
     filesize_total = 0
 
     suffix = 'opreturns' if args.opreturn else 'state'
     snapshot_filename = f'{args.folder}/{args.snapshot_height:010d}.{suffix}'
-    chunk_filenames = glob.glob(f'{args.folder}/chunks/{args.snapshot_height:010d}_**.chunk')
+    if args.zone_map:
+        zone_map = zonemap.read_zone_map(zonemap.get_zone_map_filename(args.folder, args.snapshot_height))
+        filesize_total += int(zone_map['chunk_size'].sum())
+        chunk_filenames = list()
+    else:
+        chunk_filenames = glob.glob(f'{args.folder}/chunks/{args.snapshot_height:010d}_**.chunk')
     filenames = [snapshot_filename] + chunk_filenames
 
     for filename in filenames:
@@ -3,15 +3,63 @@
     Namely, this script creates two CSV files in the given --target-folder:
 
     1. Histogram CSV file containing the counts for each txout type that occurred.
-    2. Another CSV file, which contains the output scripts of all txouts classified as "others". """
+    2. Another CSV file, which contains the output scripts of all txouts classified as "others".
+
+    With --sample, only a random (seeded) fraction of the chunk files is parsed. Both CSV files then only cover the
+    sampled chunks (and are named *_sample_histogram.csv and *_sample_others.csv), and a third CSV file
+    (*_estimate.csv) holds the estimated count of each txout type in the whole snapshot with a confidence interval.
+
+    Output files only appear under their final names once all chunks are done. Until then, progress is checkpointed
+    periodically, and an interrupted run continues from its last checkpoint with --resume. """
 
 import argparse
-import glob
+import functools
+import multiprocessing
 
 import progressbar
 
-from parse_chunk_file import parse_chunk_file
+from parse_snapshot import get_chunk_filenames, read_chunk_files
+from lib import chunk, sample
 from lib import utxo as utxo_handler
+from lib.cache import ChunkCache, DEFAULT_MAX_SIZE_CACHE
+from lib.checkpoint import JobCheckpoint, DEFAULT_CHECKPOINT_INTERVAL
+
+
+def get_histogram_cache(cache_folder, is_obfuscated_snapshot=False, max_size=DEFAULT_MAX_SIZE_CACHE):
+    """ Returns the ChunkCache of per-chunk histogram results in the given folder. """
+    # Classification differs for obfuscated snapshots, hence keep their results apart
+    namespace = 'histogram_obfuscated' if is_obfuscated_snapshot else 'histogram'
+    return ChunkCache(cache_folder, namespace, max_size=max_size)
+
+
+def get_chunk_histogram(data, is_obfuscated_snapshot=False, cache=None, with_chunk_hash=False, content_hash=None):
+    """ Returns the compact per-chunk results and whether they were found in the given ChunkCache.
+
+        Cached results are keyed by the chunk content hash (computed, unless it is given), hence the chunk is only
+        parsed on a cache miss. The chunk hash is only computed if with_chunk_hash is set, and None otherwise. """
+    chunk_height = chunk.read_chunk_height(data)
+    chunk_offset = chunk.read_chunk_offset(data)
+    chunk_hash = chunk.get_chunk_hash(data) if with_chunk_hash else None
+
+    res = None
+    if cache is not None:
+        if content_hash is None:
+            content_hash = chunk.get_chunk_content_hash(data)
+        res = cache.get(content_hash)
+    is_cache_hit = res is not None
+    if res is None:
+        _, _, _, utxos = chunk.parse_chunk(data, is_obfuscated_snapshot=is_obfuscated_snapshot)
+        res = utxo_handler.get_utxo_histogram(utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+        if cache is not None:
+            cache.put(content_hash, res)
+    histogram, other = res
+    return chunk_height, chunk_offset, chunk_hash, histogram, other, is_cache_hit
+
+
+def get_chunk_file_histogram(chunk_filename, is_obfuscated_snapshot=False, cache=None, with_chunk_hash=False):
+    """ Returns only the compact per-chunk results, so that they can be cheaply sent back from worker processes. """
+    data = chunk.read_chunk_file(chunk_filename)
+    return get_chunk_histogram(data, is_obfuscated_snapshot=is_obfuscated_snapshot, cache=cache, with_chunk_hash=with_chunk_hash)
 
 
 if __name__ == '__main__':
@@ -21,21 +69,87 @@ if __name__ == '__main__':
     argparser.add_argument('--target-folder', type=str, help='Target folder for output', default='.')
     argparser.add_argument('--target-prefix', type=str, help='Prefix of output file', default='utxo_hist_')
     argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing an obfuscated snapshot')
+    argparser.add_argument('--chunk-hash', action='store_true', help='Add the hash of each chunk to the histogram CSV file')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes parsing chunks in parallel', default=1)
+    argparser.add_argument('--cache-folder', type=str, help='Folder of a persistent cache of per-chunk results', default=None)
+    argparser.add_argument('--cache-size', type=int, help='Maximum size of the cache in bytes', default=DEFAULT_MAX_SIZE_CACHE)
+    argparser.add_argument('--sample', type=float, metavar='FRACTION', help='Only parse a random fraction of the chunk files and estimate the histogram of the whole snapshot', default=None)
+    argparser.add_argument('--seed', type=int, help='Seed of the random sample of chunk files', default=0)
+    argparser.add_argument('--confidence', type=float, help='Confidence level of the intervals of the estimates', default=0.95)
+    argparser.add_argument('--resume', action='store_true', help='Resume an interrupted run from its last checkpoint, skipping the chunks done')
+    argparser.add_argument('--checkpoint-interval', type=float, help='Seconds between checkpoints of the progress', default=DEFAULT_CHECKPOINT_INTERVAL)
     args = argparser.parse_args()
 
-    f_histogram = open(f'{args.target_folder}/{args.target_prefix}{args.snapshot_height:010d}_histogram.csv', 'w')
-    f_other = open(f'{args.target_folder}/{args.target_prefix}{args.snapshot_height:010d}_others.csv', 'w')
+    if args.sample is not None and not 0 < args.sample <= 1:
+        argparser.error('--sample must be in (0, 1]')
+    if not 0 < args.confidence < 1:
+        argparser.error('--confidence must be in (0, 1)')
+
+    output_prefix = f'{args.target_folder}/{args.target_prefix}{args.snapshot_height:010d}_'
+    if args.sample is not None:
+        output_prefix += 'sample_'
+    histogram_filename = f'{output_prefix}histogram.csv'
+    other_filename = f'{output_prefix}others.csv'
+    estimate_filename = f'{args.target_folder}/{args.target_prefix}{args.snapshot_height:010d}_estimate.csv'
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    if args.sample is not None:
+        chunk_num_utxos = chunk.read_num_utxos_files(filenames)
+        sampled_chunks = sample.sample_chunks(len(filenames), args.sample, seed=args.seed)
+        filenames = [filenames[i] for i in sampled_chunks]
+
+    # Output files are only moved to their final names once all chunks are done, see checkpoint.JobCheckpoint
+    output_filenames = [histogram_filename, other_filename] + ([estimate_filename] if args.sample is not None else [])
+    params = {k: vars(args)[k] for k in ['snapshot_height', 'obfuscated_snapshot', 'chunk_hash', 'sample', 'seed']}
+    try:
+        job = JobCheckpoint(f'{output_prefix}manifest.json', output_filenames, params, filenames, resume=args.resume, interval=args.checkpoint_interval)
+    except ValueError as e:
+        argparser.error(str(e))
+    f_histogram, f_other = job.files[:2]
+    if job.is_resumed:
+        print(f'Resuming after {len(job.done)} of {len(filenames)} chunks')
+    else:
+        utxo_handler.print_utxo_histogram_header(f_histogram, chunk_hash=args.chunk_hash)
+        utxo_handler.print_utxo_other_header(f_other)
+    if args.sample is not None:
+        # Histograms of chunks done before resuming are read back from the checkpointed histogram file
+        f_histogram.flush()
+        with open(job.get_part_filename(histogram_filename), 'r') as f:
+            sampled_histograms = [histogram for _, _, histogram in utxo_handler.read_utxo_histograms(f)]
 
-    utxo_handler.print_utxo_histogram_header(f_histogram)
-    utxo_handler.print_utxo_other_header(f_other)
-    filenames = glob.glob(f'{args.folder}/chunks/{args.snapshot_height:010d}_**.chunk')
+    pending = job.get_pending()
     bar = progressbar.ProgressBar(max_value=len(filenames), redirect_stdout=True)
-    for i, chunk_filename in enumerate(sorted(filenames)):
-        chunk_height, chunk_offset, chunk_hash, utxos = parse_chunk_file(chunk_filename, is_obfuscated_snapshot=args.obfuscated_snapshot)
-        histogram, other = utxo_handler.get_utxo_histogram(utxos, is_obfuscated_snapshot=args.obfuscated_snapshot)
-        utxo_handler.print_utxo_histogram(histogram, chunk_height, chunk_offset, f_histogram, machine=True)
+    cache = None
+    if args.cache_folder is not None:
+        cache = get_histogram_cache(args.cache_folder, is_obfuscated_snapshot=args.obfuscated_snapshot, max_size=args.cache_size)
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs)
+        worker = functools.partial(get_chunk_file_histogram, is_obfuscated_snapshot=args.obfuscated_snapshot, cache=cache, with_chunk_hash=args.chunk_hash)
+        # Pool.imap yields in submission order, hence rows are still written in (chunk_height, chunk_offset) order
+        results = pool.imap(worker, pending)
+    else:
+        pool = None
+        results = (get_chunk_histogram(data, is_obfuscated_snapshot=args.obfuscated_snapshot, cache=cache, with_chunk_hash=args.chunk_hash) for _, data in read_chunk_files(pending))
+    cache_hits = 0
+    for filename, (chunk_height, chunk_offset, chunk_hash, histogram, other, is_cache_hit) in zip(pending, results):
+        utxo_handler.print_utxo_histogram(histogram, chunk_height, chunk_offset, f_histogram, machine=True, chunk_hash=chunk_hash)
         utxo_handler.print_other_utxos(other, chunk_height, chunk_offset, f_other, machine=True)
-        bar.update(i)
+        cache_hits += is_cache_hit
+        if args.sample is not None:
+            sampled_histograms.append(histogram)
+        job.mark_done(filename)
+        bar.update(len(job.done))
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if cache is not None:
+        cache.evict()
+        print(f'Cache hits: {cache_hits}, cache misses: {len(pending) - cache_hits}')
 
-    f_histogram.close()
-    f_other.close()
+    if args.sample is not None:
+        estimates = sample.estimate_histogram(sampled_histograms, [chunk_num_utxos[i] for i in sampled_chunks], chunk_num_utxos, confidence=args.confidence)
+        f_estimate = job.files[2]
+        sample.print_histogram_estimate_header(f_estimate)
+        sample.print_histogram_estimate(estimates, f_estimate)
+        print(f'Sampled chunks: {len(sampled_chunks)} of {len(chunk_num_utxos)}')
+    job.finalize()
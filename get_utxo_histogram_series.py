@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+""" This script creates a time series of the txout types present in the snapshots of several block heights.
+
+    The snapshots of all heights are processed by one pool of worker processes. First, the content hashes of all chunk
+    files are computed, such that chunks holding identical UTXOs at several heights are parsed only once. The totals of
+    all heights are written to a single long-format CSV file in the given --target-folder, with one row per height and
+    txout type, which is the sum of the per-chunk histograms of get_utxo_histogram.py. """
+
+import argparse
+import functools
+import multiprocessing
+
+import progressbar
+
+from get_utxo_histogram import get_chunk_histogram, get_histogram_cache
+from parse_snapshot import get_chunk_filenames
+from lib import chunk
+from lib import utxo as utxo_handler
+from lib.cache import DEFAULT_MAX_SIZE_CACHE
+
+
+def parse_heights(heights):
+    """ Returns the sorted block heights of a list of single heights and inclusive START:STOP:STEP ranges. """
+    res = set()
+    for h in heights:
+        if ':' in h:
+            start, stop, step = (h.split(':') + ['1'])[:3]
+            res.update(range(int(start), int(stop) + 1, int(step)))
+        else:
+            res.add(int(h))
+    return sorted(res)
+
+
+def get_chunk_file_content_hash(chunk_filename):
+    return chunk.get_chunk_content_hash(chunk.read_chunk_file(chunk_filename))
+
+
+def get_chunk_file_counts(task, is_obfuscated_snapshot=False, cache=None):
+    """ Returns the content hash and histogram of a (content_hash, chunk_filename) task, and whether the histogram was
+        found in the given ChunkCache, see get_utxo_histogram.get_chunk_histogram. """
+    content_hash, chunk_filename = task
+    data = chunk.read_chunk_file(chunk_filename)
+    _, _, _, histogram, _, is_cache_hit = get_chunk_histogram(data, is_obfuscated_snapshot=is_obfuscated_snapshot, cache=cache, content_hash=content_hash)
+    return content_hash, histogram, is_cache_hit
+
+
+def print_series_header(file_out=None):
+    print('snapshot_height;script_type;count;relative', file=file_out)
+
+
+def print_series(snapshot_height, histogram, file_out=None):
+    total_utxos = sum(histogram.values())
+    for k in utxo_handler.ScriptType._member_names_:
+        v = histogram.get(utxo_handler.ScriptType[k], 0)
+        relative = (100. * v) / total_utxos if total_utxos else 0.
+        print(f'{snapshot_height};{utxo_handler.scripttype_labels[utxo_handler.ScriptType[k]][0]};{v};{relative}', file=file_out)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('heights', type=str, nargs='+', help='Block heights of the snapshots, either single heights or inclusive ranges START:STOP[:STEP]')
+    argparser.add_argument('--target-folder', type=str, help='Target folder for output', default='.')
+    argparser.add_argument('--target-prefix', type=str, help='Prefix of output file', default='utxo_hist_')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing obfuscated snapshots')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes parsing chunks in parallel', default=1)
+    argparser.add_argument('--cache-folder', type=str, help='Folder of a persistent cache of per-chunk results', default=None)
+    argparser.add_argument('--cache-size', type=int, help='Maximum size of the cache in bytes', default=DEFAULT_MAX_SIZE_CACHE)
+    args = argparser.parse_args()
+
+    try:
+        heights = parse_heights(args.heights)
+    except ValueError:
+        argparser.error('heights must be integers or ranges START:STOP[:STEP]')
+
+    filenames = dict()
+    for h in heights:
+        filenames[h] = get_chunk_filenames(args.folder, h)
+        if not filenames[h]:
+            print(f'No chunk files of snapshot height {h}, skipping it')
+            del filenames[h]
+    if not filenames:
+        argparser.error('no chunk files of any of the given heights')
+    all_filenames = [f for h in filenames for f in filenames[h]]
+
+    cache = None
+    if args.cache_folder is not None:
+        # Entries are shared with get_utxo_histogram.py
+        cache = get_histogram_cache(args.cache_folder, is_obfuscated_snapshot=args.obfuscated_snapshot, max_size=args.cache_size)
+    worker = functools.partial(get_chunk_file_counts, is_obfuscated_snapshot=args.obfuscated_snapshot, cache=cache)
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs)
+        imap, imap_unordered = pool.imap, pool.imap_unordered
+    else:
+        pool = None
+        imap = imap_unordered = map
+
+    # Hashing a chunk is much cheaper than parsing it, hence only the first chunk file of each content is parsed
+    content_hashes = dict(zip(all_filenames, imap(get_chunk_file_content_hash, all_filenames)))
+    unique_filenames = dict()
+    for filename, content_hash in content_hashes.items():
+        unique_filenames.setdefault(content_hash, filename)
+    print(f'Chunk files: {len(all_filenames)}, distinct chunks: {len(unique_filenames)}')
+
+    bar = progressbar.ProgressBar(max_value=len(unique_filenames), redirect_stdout=True)
+    histograms = dict()
+    cache_hits = 0
+    # Results are keyed by content hash, hence they may arrive in any order
+    for i, (content_hash, histogram, is_cache_hit) in enumerate(imap_unordered(worker, unique_filenames.items())):
+        histograms[content_hash] = histogram
+        cache_hits += is_cache_hit
+        bar.update(i)
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if cache is not None:
+        cache.evict()
+        print(f'Cache hits: {cache_hits}, cache misses: {len(unique_filenames) - cache_hits}')
+
+    with open(f'{args.target_folder}/{args.target_prefix}{min(filenames):010d}_{max(filenames):010d}_series.csv', 'w') as f_series:
+        print_series_header(f_series)
+        for h in filenames:
+            total = dict()
+            for filename in filenames[h]:
+                for script_type, count in histograms[content_hashes[filename]].items():
+                    total[script_type] = total.get(script_type, 0) + count
+            print_series(h, total, f_series)
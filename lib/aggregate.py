@@ -0,0 +1,244 @@
+""" This module holds aggregators, which compute statistics of a snapshot in a single pass over its chunks.
+
+    Each aggregator is fed the UTXOs of one chunk at a time via update, partial aggregators (e.g., of different
+    worker processes) are combined via merge, and finalize returns the result as CSV rows matching csv_header. """
+
+import numpy as np
+
+from lib import sketch, utxo
+
+
+class ChunkBatch:
+    """ The UTXOs (utxo.ChunkColumns) of a single chunk, as passed to Aggregator.update.
+
+        Derived columns are computed at most once per chunk and shared by all aggregators. """
+
+    def __init__(self, chunk_height, chunk_offset, utxos, is_obfuscated_snapshot=False):
+        self.chunk_height = chunk_height
+        self.chunk_offset = chunk_offset
+        self.utxos = utxos
+        self.is_obfuscated_snapshot = is_obfuscated_snapshot
+        self._script_types = None
+        self._payloads = None
+        self._payload_hashes = None
+
+    @property
+    def script_types(self):
+        if self._script_types is None:
+            self._script_types = utxo.classify_compressed_scripts(self.utxos.scripts, self.utxos.script_offsets, is_obfuscated_snapshot=self.is_obfuscated_snapshot)
+        return self._script_types
+
+    @property
+    def payload_hashes(self):
+        if self._payload_hashes is None:
+            self._payloads = sketch.get_payloads(self.utxos, self.script_types, is_obfuscated_snapshot=self.is_obfuscated_snapshot)
+            self._payload_hashes = sketch.hash_segments(*self._payloads)
+        return self._payload_hashes
+
+    def get_payload(self, i):
+        buffer, starts, ends = self._payloads
+        return buffer[starts[i]:ends[i]].tobytes()
+
+
+class Aggregator:
+    name = None
+    csv_header = list()
+
+    def update(self, batch):
+        raise NotImplementedError
+
+    def merge(self, other):
+        """ Merges the state of another aggregator of the same type into this one and returns this one. """
+        raise NotImplementedError
+
+    def finalize(self):
+        raise NotImplementedError
+
+
+class BinnedAggregator(Aggregator):
+    """ Counts UTXOs and sums their values per integer bin, see get_bins. """
+
+    def __init__(self):
+        self.counts = dict()
+        self.values = dict()
+
+    def get_bins(self, batch):
+        """ Returns the (bins, values) of the UTXOs of a batch to be counted. """
+        raise NotImplementedError
+
+    def update(self, batch):
+        bins, values = self.get_bins(batch)
+        if len(bins) == 0:
+            return
+        offset = int(bins.min())
+        bins = bins - offset
+        counts = np.bincount(bins, minlength=1)
+        # Sums of values within a chunk stay below 2^53, hence they are exact as float64
+        values = np.bincount(bins, weights=values, minlength=1)
+        for b in np.flatnonzero(counts):
+            self.counts[int(b) + offset] = self.counts.get(int(b) + offset, 0) + int(counts[b])
+            self.values[int(b) + offset] = self.values.get(int(b) + offset, 0) + int(values[b])
+
+    def merge(self, other):
+        for b, count in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + count
+            self.values[b] = self.values.get(b, 0) + other.values[b]
+        return self
+
+    def get_bin_label(self, b):
+        return b
+
+    def finalize(self):
+        return [(self.get_bin_label(b), self.counts[b], self.values[b]) for b in sorted(self.counts)]
+
+
+class ScriptTypeHistogram(Aggregator):
+    """ Per-chunk counts of all script types, as in the histogram CSV files of get_utxo_histogram.py. """
+    name = 'histogram'
+    csv_header = ['chunk_height', 'chunk_offset'] + [utxo.scripttype_labels[utxo.ScriptType[k]][0] for k in utxo.ScriptType._member_names_]
+
+    def __init__(self):
+        self.histograms = dict()
+
+    def update(self, batch):
+        histogram, _ = utxo.get_utxo_histogram(batch.utxos, is_obfuscated_snapshot=batch.is_obfuscated_snapshot, script_types=batch.script_types)
+        self.histograms[(batch.chunk_height, batch.chunk_offset)] = histogram
+
+    def merge(self, other):
+        self.histograms.update(other.histograms)
+        return self
+
+    def finalize(self):
+        rows = list()
+        for chunk_height, chunk_offset in sorted(self.histograms):
+            histogram = self.histograms[(chunk_height, chunk_offset)]
+            rows.append((chunk_height, chunk_offset) + tuple(histogram.get(utxo.ScriptType[k], 0) for k in utxo.ScriptType._member_names_))
+        return rows
+
+
+class ValueDistribution(BinnedAggregator):
+    """ Number and value of UTXOs per order of magnitude of their value (in satoshis).
+
+        UTXOs without value are kept in a separate bin, and all values of at least 10^9 share the last bin. """
+    name = 'value'
+    csv_header = ['min_value', 'count', 'value']
+
+    def get_bins(self, batch):
+        value = batch.utxos.value
+        # Count decimal digits exactly instead of relying on floating-point logarithms
+        return np.searchsorted(utxo.powers_of_ten, value, side='right'), value
+
+    def get_bin_label(self, b):
+        return 0 if b == 0 else 10**(b - 1)
+
+
+class AgeDistribution(BinnedAggregator):
+    """ Number and value of UTXOs per bin of bin_size block heights of their creation. """
+    name = 'age'
+    csv_header = ['min_block_height', 'count', 'value']
+
+    def __init__(self, bin_size=10000):
+        super().__init__()
+        self.bin_size = bin_size
+
+    def get_bins(self, batch):
+        return (batch.utxos.height // self.bin_size).astype(np.int64), batch.utxos.value
+
+    def get_bin_label(self, b):
+        return b * self.bin_size
+
+
+class CoinbaseShare(BinnedAggregator):
+    """ Number and value of UTXOs created by coinbase and other transactions. """
+    name = 'coinbase'
+    csv_header = ['is_coinbase', 'count', 'value']
+
+    def get_bins(self, batch):
+        return batch.utxos.is_coinbase.astype(np.int64), batch.utxos.value
+
+
+class DustCount(BinnedAggregator):
+    """ Number and value of UTXOs below the dust threshold (in satoshis) per script type. """
+    name = 'dust'
+    csv_header = ['script_type', 'count', 'value']
+
+    def __init__(self, threshold=546):
+        super().__init__()
+        self.threshold = threshold
+
+    def get_bins(self, batch):
+        is_dust = batch.utxos.value < self.threshold
+        return batch.script_types[is_dust].astype(np.int64), batch.utxos.value[is_dust]
+
+    def get_bin_label(self, b):
+        return utxo.scripttype_labels[utxo.ScriptType(b)][0]
+
+
+class DistinctPayloads(Aggregator):
+    """ Estimated number of distinct script payloads, see sketch.HyperLogLog. """
+    name = 'distinct'
+    csv_header = ['distinct_payloads', 'relative_standard_error']
+
+    def __init__(self, error=0.01):
+        self.sketch = sketch.HyperLogLog(error=error)
+
+    def update(self, batch):
+        self.sketch.update(batch.payload_hashes)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        return self
+
+    def finalize(self):
+        return [(self.sketch.estimate(), self.sketch.error)]
+
+
+class TopPayloads(Aggregator):
+    """ The k script payloads with the most UTXOs and with the highest value, see sketch.HeavyHitters.
+
+        Estimates exceed the true number or value by at most max_error with probability 1 - delta. """
+    name = 'top'
+    csv_header = ['by', 'rank', 'payload', 'estimate', 'max_error']
+
+    def __init__(self, k=20, epsilon=1e-5, delta=0.01):
+        self.epsilon = epsilon
+        self.by_count = sketch.HeavyHitters(k=k, epsilon=epsilon, delta=delta)
+        self.by_value = sketch.HeavyHitters(k=k, epsilon=epsilon, delta=delta)
+
+    def update(self, batch):
+        hashes = batch.payload_hashes
+        self.by_count.update(hashes, np.ones(len(hashes)), batch.get_payload)
+        self.by_value.update(hashes, batch.utxos.value, batch.get_payload)
+
+    def merge(self, other):
+        self.by_count.merge(other.by_count)
+        self.by_value.merge(other.by_value)
+        return self
+
+    def finalize(self):
+        rows = list()
+        for by, heavy_hitters in [('count', self.by_count), ('value', self.by_value)]:
+            max_error = int(self.epsilon * heavy_hitters.sketch.total)
+            for rank, (_, payload, estimate) in enumerate(heavy_hitters.top(), start=1):
+                rows.append((by, rank, payload.hex(), estimate, max_error))
+        return rows
+
+
+AGGREGATORS = {a.name: a for a in [ScriptTypeHistogram, ValueDistribution, AgeDistribution, CoinbaseShare, DustCount, DistinctPayloads, TopPayloads]}
+
+
+def update_aggregators(aggregators, chunk_height, chunk_offset, utxos, is_obfuscated_snapshot=False):
+    """ Feeds the UTXOs of a single chunk to all given aggregators. """
+    batch = ChunkBatch(chunk_height, chunk_offset, utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    for aggregator in aggregators:
+        aggregator.update(batch)
+
+
+def merge_aggregators(aggregators, others):
+    return [a.merge(o) for a, o in zip(aggregators, others)]
+
+
+def print_aggregator(aggregator, file_out):
+    print(';'.join(aggregator.csv_header), file=file_out)
+    for row in aggregator.finalize():
+        print(';'.join(str(v) for v in row), file=file_out)
@@ -2,6 +2,16 @@
 
 import struct
 
+import numpy as np
+
+
+# Precompiled little-endian integer formats
+
+struct_charint = struct.Struct('<B')
+struct_shortint = struct.Struct('<H')
+struct_int = struct.Struct('<I')
+struct_longint = struct.Struct('<Q')
+
 
 # File and binary helpers
 
@@ -16,7 +26,7 @@ def read_at_pos(file_handler, length, offset=None):
 
 
 def read_int(data):
-    return struct.unpack('<I', data)[0]
+    return struct_int.unpack(data)[0]
 
 
 def read_int_file(file_handler, offset=None):
@@ -24,7 +34,7 @@ def read_int_file(file_handler, offset=None):
 
 
 def write_int(n):
-    return struct.pack('<I', n)
+    return struct_int.pack(n)
 
 
 def write_int_file(file_handler, n):
@@ -32,7 +42,7 @@ def write_int_file(file_handler, n):
 
 
 def read_charint(data):
-    return struct.unpack('<B', data)[0]
+    return struct_charint.unpack(data)[0]
 
 
 def read_charint_file(file_handler, offset=None):
@@ -40,7 +50,7 @@ def read_charint_file(file_handler, offset=None):
 
 
 def write_charint(n):
-    return struct.pack('<B', n)
+    return struct_charint.pack(n)
 
 
 def write_charint_file(file_handler, n):
@@ -48,7 +58,7 @@ def write_charint_file(file_handler, n):
 
 
 def read_shortint(data):
-    return struct.unpack('<H', data)[0]
+    return struct_shortint.unpack(data)[0]
 
 
 def read_shortint_file(file_handler, offset=None):
@@ -56,7 +66,7 @@ def read_shortint_file(file_handler, offset=None):
 
 
 def write_shortint(n):
-    return struct.pack('<H', n)
+    return struct_shortint.pack(n)
 
 
 def write_shortint_file(file_handler, n):
@@ -64,7 +74,7 @@ def write_shortint_file(file_handler, n):
 
 
 def read_longint(data):
-    return struct.unpack('<Q', data)[0]
+    return struct_longint.unpack(data)[0]
 
 
 def read_longint_file(file_handler, offset=None):
@@ -72,7 +82,7 @@ def read_longint_file(file_handler, offset=None):
 
 
 def write_longint(n):
-    return struct.pack('<Q', n)
+    return struct_longint.pack(n)
 
 
 def write_longint_file(file_handler, n):
@@ -82,42 +92,40 @@ def write_longint_file(file_handler, n):
 # Bitcoin-specific base readings
 
 # See src/serialize.h:235
-def read_compact_int(data):
-    """ Returns (int, data_length). """
-    res = read_charint(data[0])
+def read_compact_int(data, offset=0):
+    """ Returns (int, data_length) or, if an offset is given, (int, new_offset). """
+    res = data[offset]
     if res < 253:
-        return res, 1
+        return res, offset + 1
     elif res == 253:
-        return read_shortint(data[1:(1 + 2)]), 3
+        return struct_shortint.unpack_from(data, offset + 1)[0], offset + 3
     elif res == 254:
-        return read_int(data[1:(1 + 4)]), 5
+        return struct_int.unpack_from(data, offset + 1)[0], offset + 5
     else:
-        return read_longint(data[1:(1 + 8)]), 9
+        return struct_longint.unpack_from(data, offset + 1)[0], offset + 9
 
 
 def read_compact_int_file(file_handler, offset=None):
-    res = read_charint_file(file_handler, offset)
-    if res < 253:
-        if offset is not None:
-            new_offset = offset + 1
-        return res, 1
-    elif res == 253:
-        res = read_shortint_file(file_handler, offset=((offset + 1) if offset is not None else None))
-        if offset is not None:
-            new_offset = offset + 3
+    """ Returns int or, if an offset is given, (int, new_offset) without moving the file position. """
+    if offset is not None:
+        old_pos = file_handler.tell()
+        file_handler.seek(offset)
+    res = file_handler.read(1)[0]
+    length = 1
+    if res == 253:
+        res = read_shortint(file_handler.read(2))
+        length = 3
     elif res == 254:
-        res = read_int_file(file_handler, offset=((offset + 1) if offset is not None else None))
-        if offset is not None:
-            new_offset = offset + 5
-    else:
-        res = read_longint_file(file_handler, offset=((offset + 1) if offset is not None else None))
-        if offset is not None:
-            new_offset = offset + 9
+        res = read_int(file_handler.read(4))
+        length = 5
+    elif res == 255:
+        res = read_longint(file_handler.read(8))
+        length = 9
 
     if offset is None:
         return res
-    else:
-        return res, new_offset
+    file_handler.seek(old_pos)
+    return res, offset + length
 
 
 def write_compact_int(n):
@@ -135,12 +143,25 @@ def write_compact_int_file(file_handler, n):
     file_handler.write(write_compact_int(n))
 
 
+def get_compact_int_size(n):
+    """ Returns len(write_compact_int(n)) without encoding n. """
+    if n < 253:
+        return 1
+    elif n <= 2**16 - 1:
+        return 3
+    elif n <= 2**32 - 1:
+        return 5
+    else:
+        return 9
+
+
 # VARINTs
 
 
-def read_varint(data):
+def read_varint(data, offset=0):
+    """ Returns (int, data_length) or, if an offset is given, (int, new_offset). """
     n = 0
-    i = 0
+    i = offset
     while True:
         b = data[i]
         i += 1
@@ -154,8 +175,7 @@ def read_varint(data):
 def read_varint_file(file_handler):
     n = 0
     while True:
-        b = file_handler.read(1)
-        b = struct.unpack('B', b)[0]
+        b = file_handler.read(1)[0]
         n = (n << 7) | (b & 0x7F)
         if b & 0x80:
             n += 1
@@ -163,18 +183,59 @@ def read_varint_file(file_handler):
             return n
 
 
+def read_varints(data, count, offset=0):
+    """ Decodes count consecutive VARINTs (of at most 64 bits) at once.
+
+        Returns (uint64 array, new_offset). """
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64), offset
+    buffer = np.frombuffer(data, dtype=np.uint8, count=min(len(data) - offset, 10 * count), offset=offset)
+    ends = np.flatnonzero(buffer < 0x80)[:count] + 1
+    if len(ends) < count:
+        raise ValueError('Buffer holds fewer VARINTs than requested')
+    starts = np.concatenate(([0], ends[:-1])).astype(np.int64)
+    lengths = ends - starts
+
+    # Process the i-th byte of all VARINTs at once, while VARINTs are aligned at their last byte
+    res = np.zeros(count, dtype=np.uint64)
+    for i in range(int(lengths.max()), 0, -1):
+        has_byte = lengths >= i
+        b = buffer[ends[has_byte] - i].astype(np.uint64)
+        res[has_byte] = (res[has_byte] << np.uint64(7)) | (b & np.uint64(0x7F))
+        res[has_byte] += (b >> np.uint64(7))
+    return res, offset + int(ends[-1])
+
+
+def read_varints_at(data, offsets):
+    """ Decodes one VARINT (of at most 64 bits) at each of the given offsets at once.
+
+        Returns (uint64 array, array of the offsets after each VARINT). """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    ends = np.array(offsets, dtype=np.int64)
+    res = np.zeros(len(ends), dtype=np.uint64)
+    active = np.arange(len(ends))
+    # Process the i-th byte of all VARINTs that are still continued
+    for _ in range(10):
+        if len(active) == 0:
+            break
+        b = buffer[ends[active]].astype(np.uint64)
+        res[active] = ((res[active] << np.uint64(7)) | (b & np.uint64(0x7F))) + (b >> np.uint64(7))
+        ends[active] += 1
+        active = active[b >= 0x80]
+    if len(active):
+        raise ValueError('VARINT exceeds 64 bits')
+    return res, ends
+
+
 # See src/serialize.h:372
 def write_varint(n):
-    res = b''
     n = int(n)
-    length = 0
-    while True:
-        res += struct.pack('<B', (n & 0x7F) | (0x80 if length else 0x00))
-        if n <= 0x7F:
-            break
+    res = bytearray((n & 0x7F,))
+    while n > 0x7F:
         n = (n >> 7) - 1
-        length += 1
-    return res[::-1]
+        res.append((n & 0x7F) | 0x80)
+    res.reverse()
+    return bytes(res)
 
 
 def write_varint_file(file_handler, n):
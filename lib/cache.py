@@ -0,0 +1,59 @@
+""" This module holds a persistent cache for per-chunk results. """
+
+import os
+import pickle
+import tempfile
+
+
+DEFAULT_MAX_SIZE_CACHE = 2**30
+
+
+class ChunkCache:
+    """ On-disk cache of per-chunk results keyed by chunk hash, with one file per entry.
+
+        Entries are written atomically, such that worker processes may share a cache. Reading an entry updates its
+        modification time, which evict uses to remove the least recently used entries once the cache exceeds
+        max_size bytes. The namespace separates results of different kinds (or configurations) for the same chunk. """
+
+    def __init__(self, folder, namespace, max_size=DEFAULT_MAX_SIZE_CACHE):
+        self.folder = folder
+        self.namespace = namespace
+        self.max_size = max_size
+        os.makedirs(self.folder, exist_ok=True)
+
+    def get_filename(self, chunk_hash):
+        return f'{self.folder}/{self.namespace}_{chunk_hash}.pickle'
+
+    def get(self, chunk_hash):
+        """ Returns the cached result or None. """
+        filename = self.get_filename(chunk_hash)
+        try:
+            with open(filename, 'rb') as f:
+                res = pickle.load(f)
+            os.utime(filename)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return res
+
+    def put(self, chunk_hash, res):
+        fd, filename_tmp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(filename_tmp, self.get_filename(chunk_hash))
+
+    def evict(self):
+        """ Removes the least recently used entries (of all namespaces) until the cache fits into max_size. """
+        entries = list()
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.pickle'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(e[1] for e in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
@@ -0,0 +1,110 @@
+""" This module holds checkpoints of long-running jobs over the chunk files of a snapshot, which allow to resume them. """
+
+import os
+import json
+import time
+import tempfile
+
+
+DEFAULT_CHECKPOINT_INTERVAL = 60
+
+
+def fsync_folder(folder):
+    """ Persists the entries of a folder, e.g., after files were renamed within it. """
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JobCheckpoint:
+    """ Tracks a job, which processes chunk files in a fixed order and appends the results of each to its output files.
+
+        Output files are written as *.part files next to their final names. The JSON manifest records the job
+        parameters, the chunk files done and the size of each output file at the last checkpoint. Output files are
+        fsync'd before the manifest is atomically replaced, hence resuming truncates them to these sizes and continues
+        with the first chunk file not done, such that no row is lost or written twice. finalize atomically renames the
+        output files to their final names and removes the manifest.
+
+        A checkpoint is written every interval seconds, at the earliest after a chunk file is done. """
+
+    def __init__(self, manifest_filename, output_filenames, params, filenames, resume=False, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.manifest_filename = manifest_filename
+        self.output_filenames = output_filenames
+        self.params = params
+        self.filenames = list(filenames)
+        self.interval = interval
+        self.done = list()
+        self.is_resumed = False
+
+        sizes = None
+        if resume and os.path.exists(manifest_filename):
+            with open(manifest_filename, 'r') as f:
+                manifest = json.load(f)
+            if manifest['params'] != params or manifest['filenames'] != self.filenames:
+                raise ValueError(f'Checkpoint {manifest_filename} belongs to a job with other parameters')
+            self.done = manifest['done']
+            sizes = manifest['sizes']
+            self.is_resumed = True
+
+        self.files = list()
+        for filename in output_filenames:
+            if sizes is None:
+                f = open(self.get_part_filename(filename), 'w')
+            else:
+                f = open(self.get_part_filename(filename), 'r+')
+                f.truncate(sizes[filename])
+                f.seek(sizes[filename])
+            self.files.append(f)
+        self.last_checkpoint = time.monotonic()
+
+    @staticmethod
+    def get_part_filename(filename):
+        return f'{filename}.part'
+
+    def get_pending(self):
+        """ Returns the chunk files not done yet, in job order. """
+        return self.filenames[len(self.done):]
+
+    def mark_done(self, filename):
+        """ Marks the next chunk file as done, after its results were written to the output files. """
+        assert filename == self.filenames[len(self.done)]
+        self.done.append(filename)
+        if time.monotonic() - self.last_checkpoint >= self.interval:
+            self.checkpoint()
+
+    def sync(self):
+        for f in self.files:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def checkpoint(self):
+        self.sync()
+        manifest = {
+            'params': self.params,
+            'filenames': self.filenames,
+            'done': self.done,
+            'sizes': {filename: f.tell() for filename, f in zip(self.output_filenames, self.files)},
+        }
+        folder = os.path.dirname(os.path.abspath(self.manifest_filename))
+        fd, filename_tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(filename_tmp, self.manifest_filename)
+        fsync_folder(folder)
+        self.last_checkpoint = time.monotonic()
+
+    def finalize(self):
+        """ Moves all output files to their final names, once all chunk files are done. """
+        assert len(self.done) == len(self.filenames)
+        self.sync()
+        for filename, f in zip(self.output_filenames, self.files):
+            f.close()
+            os.replace(self.get_part_filename(filename), filename)
+        for folder in {os.path.dirname(os.path.abspath(filename)) for filename in self.output_filenames}:
+            fsync_folder(folder)
+        if os.path.exists(self.manifest_filename):
+            os.remove(self.manifest_filename)
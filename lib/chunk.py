@@ -1,14 +1,28 @@
 """ This file holds chunk-related functionality. """
 
 
+import os
+import glob
 import hashlib
 from binascii import hexlify
 
-from lib import base
+from lib import base, utxo
+from lib.state import write_snapshot_file
 
 
 MAX_SIZE_CHUNK = 10**6
 
+# Chunk height and chunk offset, followed by the compact int number of UTXOs
+SIZE_CHUNK_HEADER = 4 + 4
+
+
+def get_state_filename(folder, snapshot_height, suffix='state'):
+    return f'{folder}/{snapshot_height:010d}.{suffix}'
+
+
+def get_chunk_filename(folder, snapshot_height, chunk_offset):
+    return f'{folder}/chunks/{snapshot_height:010d}_{chunk_offset:010d}.chunk'
+
 
 # Chunk hash
 
@@ -25,8 +39,18 @@ def get_chunk_hash_file(file_handler):
     return get_chunk_hash(chunk)
 
 
+def get_chunk_content_hash(chunk):
+    """ Hashes a chunk without its height and offset header, such that equal UTXO sets share the same hash, even if
+        they belong to different snapshot heights or chunk offsets. """
+    return get_chunk_hash(chunk[8:])
+
+
 # Chunk height
 
+def read_chunk_height(data):
+    return base.read_int(data[0:4])
+
+
 def read_chunk_height_file(file_handler):
     return base.read_int_file(file_handler, offset=0)
 
@@ -37,6 +61,10 @@ def write_chunk_height_file(file_handler, snapshot_height):
 
 # Chunk offset
 
+def read_chunk_offset(data):
+    return base.read_int(data[4:8])
+
+
 def read_chunk_offset_file(file_handler):
     return base.read_int_file(file_handler, offset=4)
 
@@ -56,18 +84,120 @@ def check_chunk_length(chunk_size_old, num_entries_old, candidate_entry):
 # Number of UTXOs in chunk
 
 
+def read_num_utxos(data):
+    """ Returns (number_utxos, offset of the first UTXO). """
+    return base.read_compact_int(data, offset=8)
+
+
 def read_num_utxos_file(file_handler):
     number_utxos, new_offset = base.read_compact_int_file(file_handler, offset=8)
     return number_utxos, new_offset
 
 
+def read_num_utxos_files(filenames):
+    """ Returns the number of UTXOs of each given chunk file, read from its header only. """
+    res = list()
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            res.append(read_num_utxos_file(f)[0])
+    return res
+
+
 def write_utxos_file(file_handler, utxos):
     base.write_compact_int_file(file_handler, len(utxos))
-    utxos_serialized = b''.join(utxos)
-    file_handler.write(utxos_serialized)
+    file_handler.writelines(utxos)
 
 
 def write_opreturns_file(file_handler, opreturns):
     base.write_compact_int_file(file_handler, len(opreturns))
-    opreturns_serialized = b''.join(opreturns)
-    file_handler.write(opreturns_serialized)
+    file_handler.writelines(opreturns)
+
+
+# Chunk writing
+
+class ChunkWriter:
+    """ Writes serialized UTXOs into consecutive chunk files of a snapshot, each of at most max_size bytes.
+
+        UTXOs are buffered until the next one would exceed max_size, at which point the buffered ones are written as a
+        chunk. The size of the pending chunk is tracked incrementally and its hash is computed while writing, see
+        chunk_hashes. Closing the writer flushes the last chunk and writes the state file.
+
+        Leftover chunks of an earlier snapshot of the same height would be taken as part of the new one, hence
+        FileExistsError is raised if its chunks or state file exist, unless overwrite is set. Then, these and all other
+        files of the snapshot (e.g., zone maps) are removed first. """
+
+    def __init__(self, folder, snapshot_height, max_size=MAX_SIZE_CHUNK, overwrite=False):
+        existing = glob.glob(f'{folder}/chunks/{snapshot_height:010d}_*.chunk')
+        if os.path.exists(get_state_filename(folder, snapshot_height)):
+            existing.append(get_state_filename(folder, snapshot_height))
+        if existing and not overwrite:
+            raise FileExistsError(f'Snapshot {snapshot_height} already exists in {folder}')
+        if overwrite:
+            for filename in set(existing + glob.glob(f'{folder}/{snapshot_height:010d}.*')):
+                os.remove(filename)
+        self.folder = folder
+        self.snapshot_height = snapshot_height
+        self.max_size = max_size
+        self.num_chunks = 0
+        self.chunk_hashes = list()
+        self.entries = list()
+        self.size_entries = 0
+        os.makedirs(f'{folder}/chunks', exist_ok=True)
+
+    def get_chunk_size(self, num_entries=None):
+        if num_entries is None:
+            num_entries = len(self.entries)
+        return SIZE_CHUNK_HEADER + base.get_compact_int_size(num_entries) + self.size_entries
+
+    def add(self, entry):
+        """ Adds a serialized UTXO (outpoint and coin) and flushes the pending chunk first if it would not fit. """
+        if self.entries and self.get_chunk_size(len(self.entries) + 1) + len(entry) > self.max_size:
+            self.flush()
+        self.entries.append(entry)
+        self.size_entries += len(entry)
+
+    def add_all(self, entries):
+        for entry in entries:
+            self.add(entry)
+
+    def flush(self):
+        """ Writes the pending UTXOs as the next chunk, if any. """
+        if not self.entries:
+            return
+        header = base.write_int(self.snapshot_height) + base.write_int(self.num_chunks) + base.write_compact_int(len(self.entries))
+        chunk_hash = hashlib.sha256(header)
+        with open(get_chunk_filename(self.folder, self.snapshot_height, self.num_chunks), 'wb') as f:
+            f.write(header)
+            for entry in self.entries:
+                f.write(entry)
+                chunk_hash.update(entry)
+        self.chunk_hashes.append(hexlify(hashlib.sha256(chunk_hash.digest()).digest()).decode())
+        self.num_chunks += 1
+        self.entries = list()
+        self.size_entries = 0
+
+    def close(self, block_hash):
+        """ Flushes the last chunk and writes the state file with the given block hash. Returns the number of chunks. """
+        self.flush()
+        with open(get_state_filename(self.folder, self.snapshot_height), 'wb') as f:
+            write_snapshot_file(f, self.snapshot_height, block_hash, self.num_chunks)
+        return self.num_chunks
+
+
+# Whole chunks
+
+def read_chunk_file(filename):
+    """ Reads a whole chunk file at once, which is feasible as chunks are capped at MAX_SIZE_CHUNK bytes. """
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def parse_chunk(data, is_obfuscated_snapshot=False):
+    """ Parses a whole chunk from a bytes-like buffer (e.g., bytes or mmap) into utxo.ChunkColumns.
+
+        Returns (chunk_height, chunk_offset, chunk_num_utxos, utxos). """
+    chunk_height = read_chunk_height(data)
+    chunk_offset = read_chunk_offset(data)
+    chunk_num_utxos, offset = read_num_utxos(data)
+    chunk_utxos = utxo.read_chunk_columns(data, offset, chunk_num_utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    return chunk_height, chunk_offset, chunk_num_utxos, chunk_utxos
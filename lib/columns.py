@@ -0,0 +1,88 @@
+""" This module holds the columnar export of a snapshot, which is decoded once instead of in every analysis.
+
+    The export is a folder of memory-mappable column files, one row per UTXO in chunk order: the fixed-width fields
+    of utxo.ChunkColumns, the script type of each UTXO, and the compressed scripts in a single byte heap with offsets.
+    Loading the export maps all files, such that later queries operate on zero-copy NumPy views. """
+
+import os
+
+import numpy as np
+
+from lib import chunk, utxo
+
+
+column_dtypes = {
+    'txid': np.dtype(('u1', (32,))),
+    'vout': np.dtype('<u4'),
+    'height': np.dtype('<u4'),
+    'is_coinbase': np.dtype('u1'),
+    'value': np.dtype('<u8'),
+    'script_type': np.dtype('<i2'),
+}
+
+
+def get_columns_folder(folder, snapshot_height):
+    return f'{folder}/{snapshot_height:010d}.columns'
+
+
+def get_column_filename(columns_folder, name):
+    return f'{columns_folder}/{name}.npy'
+
+
+def get_script_heap_filename(columns_folder):
+    # The heap size is only known after parsing, hence it is written as raw bytes instead of a .npy file
+    return f'{columns_folder}/scripts.bin'
+
+
+def export_columns(folder, snapshot_height, filenames, is_obfuscated_snapshot=False, chunks=None):
+    """ Exports the UTXOs of the given chunk files into the column files of a snapshot.
+
+        If chunks (as yielded by parse_snapshot.iter_snapshot) are given, they are used instead of parsing the chunk
+        files. Returns the number of exported UTXOs. """
+    num_utxos = sum(chunk.read_num_utxos_files(filenames))
+
+    columns_folder = get_columns_folder(folder, snapshot_height)
+    os.makedirs(columns_folder, exist_ok=True)
+    columns = {name: np.lib.format.open_memmap(get_column_filename(columns_folder, name), mode='w+', dtype=dtype, shape=(num_utxos,)) for name, dtype in column_dtypes.items()}
+    script_offsets = np.lib.format.open_memmap(get_column_filename(columns_folder, 'script_offsets'), mode='w+', dtype='<i8', shape=(num_utxos + 1,))
+    chunk_starts = np.lib.format.open_memmap(get_column_filename(columns_folder, 'chunk_starts'), mode='w+', dtype='<i8', shape=(len(filenames) + 1,))
+
+    if chunks is None:
+        chunks = (chunk.parse_chunk(chunk.read_chunk_file(f), is_obfuscated_snapshot=is_obfuscated_snapshot) for f in filenames)
+    start = 0
+    script_offsets[0] = 0
+    chunk_starts[0] = 0
+    with open(get_script_heap_filename(columns_folder), 'wb') as f_scripts:
+        for i, (_, _, chunk_num_utxos, utxos) in enumerate(chunks):
+            end = start + chunk_num_utxos
+            columns['txid'][start:end] = utxos.txid
+            columns['vout'][start:end] = utxos.vout
+            columns['height'][start:end] = utxos.height
+            columns['is_coinbase'][start:end] = utxos.is_coinbase
+            columns['value'][start:end] = utxos.value
+            columns['script_type'][start:end] = utxo.classify_compressed_scripts(utxos.scripts, utxos.script_offsets, is_obfuscated_snapshot=is_obfuscated_snapshot)
+            script_offsets[(start + 1):(end + 1)] = utxos.script_offsets[1:] + script_offsets[start]
+            f_scripts.write(utxos.scripts.tobytes())
+            chunk_starts[i + 1] = end
+            start = end
+
+    for column in list(columns.values()) + [script_offsets, chunk_starts]:
+        column.flush()
+    return num_utxos
+
+
+def read_columns(folder, snapshot_height):
+    """ Returns the memory-mapped (utxos, script_types, chunk_starts) of an exported snapshot.
+
+        utxos are utxo.ChunkColumns spanning the whole snapshot, and the UTXOs of the i-th chunk are the rows
+        chunk_starts[i] to chunk_starts[i + 1]. """
+    columns_folder = get_columns_folder(folder, snapshot_height)
+    columns = {name: np.load(get_column_filename(columns_folder, name), mmap_mode='r') for name in column_dtypes}
+    script_offsets = np.load(get_column_filename(columns_folder, 'script_offsets'), mmap_mode='r')
+    chunk_starts = np.load(get_column_filename(columns_folder, 'chunk_starts'), mmap_mode='r')
+    # Empty files cannot be memory-mapped
+    heap_filename = get_script_heap_filename(columns_folder)
+    scripts = np.memmap(heap_filename, dtype=np.uint8, mode='r') if os.path.getsize(heap_filename) else np.zeros(0, dtype=np.uint8)
+
+    utxos = utxo.ChunkColumns(columns['txid'], columns['vout'], columns['height'], columns['is_coinbase'], columns['value'], scripts, script_offsets)
+    return utxos, columns['script_type'], chunk_starts
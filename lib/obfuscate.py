@@ -11,11 +11,11 @@ threshold_value = SECP256k1.order >> 1
 
 # https://github.com/warner/python-ecdsa/issues/121#issuecomment-536637013
 def encode_commitment(commitment):
-    enc_x = number_to_string(commitment.x, SECP256k1.order)
-    return (b'\x03' + enc_x) if commitment.y % 2 else (b'\x02' + enc_x)
+    enc_x = number_to_string(commitment.x(), SECP256k1.order)
+    return (b'\x03' + enc_x) if commitment.y() % 2 else (b'\x02' + enc_x)
 
 
-def obfuscate_payload(data):
+def get_private_value_int(data):
     private_value = data
     private_value_int = int.from_bytes(private_value, byteorder='big', signed='false')
     # Apply OP_HASH256 until value is suitable, if too long for SECP256k1
@@ -23,8 +23,11 @@ def obfuscate_payload(data):
         private_value = hashlib.sha256(private_value).digest()
         private_value = hashlib.sha256(private_value).digest()
         private_value_int = int.from_bytes(private_value, byteorder='big', signed='false')
+    return private_value_int
+
 
-    public_value_int = private_value_int * SECP256k1.generator
+def obfuscate_payload(data):
+    public_value_int = get_private_value_int(data) * SECP256k1.generator
     return encode_commitment(public_value_int)
 
 
@@ -32,6 +35,113 @@ def verify_obfuscated_payload(data, commitment):
     return obfuscate_payload(data) == commitment
 
 
+# Batch obfuscation
+#
+# Multiplying the generator with many scalars one by one spends most of the time in point doublings and modular
+# inversions. Instead, the multiples j * 2^(WINDOW_BITS * i) * G of all windows i and digits j are precomputed once,
+# such that each scalar multiplication reduces to one mixed addition per window in Jacobian coordinates. The
+# conversion of all results back to affine coordinates shares a single modular inversion (Montgomery's trick).
+
+WINDOW_BITS = 8
+
+field_prime = SECP256k1.curve.p()
+num_windows = (SECP256k1.order.bit_length() + WINDOW_BITS - 1) // WINDOW_BITS
+generator_table = None
+
+
+def add_jacobian_affine(point, x2, y2):
+    """ Adds the affine point (x2, y2) to the Jacobian point (X, Y, Z) on SECP256k1, where Z == 0 denotes infinity. """
+    p = field_prime
+    x1, y1, z1 = point
+    if z1 == 0:
+        return x2, y2, 1
+    z1z1 = z1 * z1 % p
+    h = (x2 * z1z1 - x1) % p
+    r = (y2 * z1 * z1z1 - y1) % p
+    if h == 0:
+        return double_jacobian(point) if r == 0 else (1, 1, 0)
+    hh = h * h % p
+    hhh = h * hh % p
+    v = x1 * hh % p
+    x3 = (r * r - hhh - 2 * v) % p
+    y3 = (r * (v - x3) - y1 * hhh) % p
+    return x3, y3, z1 * h % p
+
+
+def double_jacobian(point):
+    p = field_prime
+    x1, y1, z1 = point
+    if z1 == 0 or y1 == 0:
+        return 1, 1, 0
+    yy = y1 * y1 % p
+    s = 4 * x1 * yy % p
+    m = 3 * x1 * x1 % p  # The curve parameter a is 0
+    x3 = (m * m - 2 * s) % p
+    y3 = (m * (s - x3) - 8 * yy * yy) % p
+    return x3, y3, 2 * y1 * z1 % p
+
+
+def normalize_jacobian_points(points):
+    """ Converts Jacobian points, none of which may be infinity, to affine (x, y) with a single modular inversion. """
+    p = field_prime
+    prefix = [1] * (len(points) + 1)
+    for i, (_, _, z) in enumerate(points):
+        prefix[i + 1] = prefix[i] * z % p
+    inverse = pow(prefix[-1], -1, p)
+    res = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        x, y, z = points[i]
+        z_inv = inverse * prefix[i] % p
+        inverse = inverse * z % p
+        z_inv2 = z_inv * z_inv % p
+        res[i] = (x * z_inv2 % p, y * z_inv2 * z_inv % p)
+    return res
+
+
+def get_generator_table():
+    """ Returns the lazily built table, where generator_table[i][j] holds the affine j * 2^(WINDOW_BITS * i) * G. """
+    global generator_table
+    if generator_table is None:
+        num_digits = 1 << WINDOW_BITS
+        window_base = (SECP256k1.generator.x(), SECP256k1.generator.y())
+        points = list()
+        for _ in range(num_windows):
+            point = (window_base[0], window_base[1], 1)
+            points.append(point)
+            for _ in range(num_digits - 2):
+                point = add_jacobian_affine(point, *window_base)
+                points.append(point)
+            # The next window starts at num_digits times the current window base
+            window_base = normalize_jacobian_points([add_jacobian_affine(point, *window_base)])[0]
+        affine = normalize_jacobian_points(points)
+        generator_table = [[None] + affine[(i * (num_digits - 1)):((i + 1) * (num_digits - 1))] for i in range(num_windows)]
+    return generator_table
+
+
+def obfuscate_payloads(payloads):
+    """ Batch version of obfuscate_payload, returning the same commitments for a list of payloads. """
+    table = get_generator_table()
+    mask = (1 << WINDOW_BITS) - 1
+    points = list()
+    for data in payloads:
+        k = get_private_value_int(data) % SECP256k1.order
+        if k == 0:
+            raise ValueError('Payload maps to the point at infinity')
+        point = (1, 1, 0)
+        for window in table:
+            digit = k & mask
+            if digit:
+                point = add_jacobian_affine(point, *window[digit])
+            k >>= WINDOW_BITS
+        points.append(point)
+
+    res = list()
+    for x, y in normalize_jacobian_points(points):
+        enc_x = x.to_bytes(32, byteorder='big')
+        res.append((b'\x03' + enc_x) if y % 2 else (b'\x02' + enc_x))
+    return res
+
+
 def encode_commitment_simple(commitment):
     return commitment
 
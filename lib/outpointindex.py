@@ -0,0 +1,166 @@
+""" This module holds the outpoint index, which locates UTXOs of a snapshot by their outpoint.
+
+    The index consists of memory-mappable sidecar files: a table of all outpoints of the snapshot, sorted by
+    (txid, vout), the locations (chunk offset and position within the chunk) of the respective UTXOs, and one Bloom
+    filter per chunk with the chunk's first and last outpoint. As chunks are written in outpoint order, each outpoint
+    can only be located in the single chunk whose range covers it, hence negative lookups are answered by that chunk's
+    Bloom filter (or the ranges alone) without touching the (large) table. Keys and locations are kept in separate
+    files, as binary search on a contiguous key array does not copy it into memory. """
+
+import numpy as np
+
+from lib import chunk
+
+
+BLOOM_BITS_PER_UTXO = 10
+BLOOM_NUM_HASHES = 7
+
+outpoint_key_dtype = np.dtype('S36')
+
+outpoint_location_dtype = np.dtype([
+    ('chunk_offset', '<u4'),
+    ('position', '<u4'),
+])
+
+
+def get_outpoint_index_filename(folder, snapshot_height):
+    return f'{folder}/{snapshot_height:010d}.outpoints.npy'
+
+
+def get_outpoint_locations_filename(folder, snapshot_height):
+    return f'{folder}/{snapshot_height:010d}.locations.npy'
+
+
+def get_bloom_filters_filename(folder, snapshot_height):
+    return f'{folder}/{snapshot_height:010d}.bloom.npy'
+
+
+def get_bloom_filters_dtype(num_bits):
+    # Empty chunks have min_key > max_key, such that no outpoint falls into their range
+    return np.dtype([('chunk_offset', '<u4'), ('min_key', outpoint_key_dtype), ('max_key', outpoint_key_dtype), ('bits', 'u1', (num_bits // 8,))])
+
+
+def get_outpoint_keys(txids, vouts):
+    """ Returns S36 keys of serialized txids (as in ChunkColumns) and big-endian vouts, which sort as (txid, vout). """
+    vouts = np.asarray(vouts, dtype='>u4').view(np.uint8).reshape(-1, 4)
+    return np.concatenate((np.asarray(txids, dtype=np.uint8).reshape(-1, 32), vouts), axis=1).view(outpoint_key_dtype).reshape(-1)
+
+
+def get_bloom_positions(keys, num_bits):
+    """ Returns the (len(keys), BLOOM_NUM_HASHES) bit positions of the keys via double hashing.
+
+        Txids are uniformly distributed already, hence their bytes serve as hash values. """
+    data = np.ascontiguousarray(keys, dtype=outpoint_key_dtype).view(np.uint8).reshape(-1, 36)
+    h1 = data[:, 0:8].copy().view('<u8').reshape(-1)
+    h2 = data[:, 8:16].copy().view('<u8').reshape(-1) | np.uint64(1)
+    h1 ^= data[:, 32:36].copy().view('>u4').reshape(-1).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    hashes = np.arange(BLOOM_NUM_HASHES, dtype=np.uint64)
+    return (h1[:, None] + hashes[None, :] * h2[:, None]) & np.uint64(num_bits - 1)
+
+
+def get_bloom_num_bits(max_num_utxos):
+    """ Returns the power of two number of bits used for each chunk's Bloom filter. """
+    return max(64, 1 << int(BLOOM_BITS_PER_UTXO * max(max_num_utxos, 1) - 1).bit_length())
+
+
+def build_outpoint_index(folder, snapshot_height, filenames, is_obfuscated_snapshot=False, chunks=None):
+    """ Builds the outpoint table and Bloom filters of a snapshot from the given chunk files.
+
+        Both are written as memory-mapped files chunk by chunk. If chunks (as yielded by parse_snapshot.iter_snapshot)
+        are given, they are used instead of parsing the chunk files. """
+    chunk_num_utxos = chunk.read_num_utxos_files(filenames)
+    num_utxos = sum(chunk_num_utxos)
+    num_bits = get_bloom_num_bits(max(chunk_num_utxos, default=0))
+
+    table = np.lib.format.open_memmap(get_outpoint_index_filename(folder, snapshot_height), mode='w+', dtype=outpoint_key_dtype, shape=(num_utxos,))
+    locations = np.lib.format.open_memmap(get_outpoint_locations_filename(folder, snapshot_height), mode='w+', dtype=outpoint_location_dtype, shape=(num_utxos,))
+    blooms = np.lib.format.open_memmap(get_bloom_filters_filename(folder, snapshot_height), mode='w+', dtype=get_bloom_filters_dtype(num_bits), shape=(len(filenames),))
+
+    if chunks is None:
+        chunks = (chunk.parse_chunk(chunk.read_chunk_file(f), is_obfuscated_snapshot=is_obfuscated_snapshot) for f in filenames)
+    start = 0
+    is_sorted = True
+    for i, (_, chunk_offset, chunk_num_utxos, utxos) in enumerate(chunks):
+        keys = get_outpoint_keys(utxos.txid, utxos.vout)
+        table[start:(start + chunk_num_utxos)] = keys
+        rows = locations[start:(start + chunk_num_utxos)]
+        rows['chunk_offset'] = chunk_offset
+        rows['position'] = np.arange(chunk_num_utxos, dtype=np.uint32)
+        blooms['chunk_offset'][i] = chunk_offset
+        blooms['min_key'][i] = b'\xff' * 36
+        blooms['max_key'][i] = b''
+        if chunk_num_utxos:
+            is_chunk_sorted = bool(np.all(keys[1:] >= keys[:-1]))
+            is_sorted &= is_chunk_sorted and (start == 0 or bool(table[start - 1] <= keys[0]))
+            sorted_keys = keys if is_chunk_sorted else np.sort(keys)
+            blooms['min_key'][i] = sorted_keys[0]
+            blooms['max_key'][i] = sorted_keys[-1]
+
+        bits = np.zeros(num_bits, dtype=bool)
+        bits[get_bloom_positions(keys, num_bits).reshape(-1).astype(np.int64)] = True
+        blooms['bits'][i] = np.packbits(bits)
+        start += chunk_num_utxos
+
+    # Snapshots are usually written in outpoint order already, such that sorting is only a fallback
+    if not is_sorted:
+        order = np.argsort(table, kind='stable')
+        table[:] = table[order]
+        locations[:] = locations[order]
+    table.flush()
+    locations.flush()
+    blooms.flush()
+
+
+def read_outpoint_index(folder, snapshot_height):
+    """ Returns the memory-mapped (table, locations, bloom_filters) of a snapshot. """
+    table = np.load(get_outpoint_index_filename(folder, snapshot_height), mmap_mode='r')
+    locations = np.load(get_outpoint_locations_filename(folder, snapshot_height), mmap_mode='r')
+    blooms = np.load(get_bloom_filters_filename(folder, snapshot_height), mmap_mode='r')
+    if 'min_key' not in blooms.dtype.names:
+        raise ValueError('Outpoint index lacks the outpoint ranges of the chunks, rebuild it')
+    return table, locations, blooms
+
+
+def test_bloom_filters(blooms, keys):
+    """ Returns a boolean mask of the keys that may be contained in the snapshot according to the Bloom filters.
+
+        Each key is only tested against the Bloom filter of the chunk whose outpoint range covers it. If the ranges of
+        chunks overlap, i.e., the snapshot is not in outpoint order, no key can be ruled out. """
+    num_bits = 8 * blooms.dtype['bits'].shape[0]
+    chunks = np.flatnonzero(blooms['min_key'] <= blooms['max_key'])
+    min_keys = blooms['min_key'][chunks]
+    max_keys = blooms['max_key'][chunks]
+    if not np.all(min_keys[1:] > max_keys[:-1]):
+        return np.ones(len(keys), dtype=bool)
+
+    indices = np.searchsorted(min_keys, keys, side='right') - 1
+    candidates = np.flatnonzero(indices >= 0)
+    candidates = candidates[keys[candidates] <= max_keys[indices[candidates]]]
+    chunks = chunks[indices[candidates]]
+    bit_positions = get_bloom_positions(keys[candidates], num_bits).astype(np.int64)
+    masks = np.uint8(0x80) >> (bit_positions & 7).astype(np.uint8)
+    maybe = np.zeros(len(keys), dtype=bool)
+    maybe[candidates] = ((blooms['bits'][chunks[:, None], bit_positions >> 3] & masks) != 0).all(axis=1)
+    return maybe
+
+
+def lookup_outpoints(table, locations, blooms, keys):
+    """ Looks up the given outpoint keys (see get_outpoint_keys).
+
+        Returns (found, chunk_offsets, positions) arrays, where the latter two are only valid for found outpoints. """
+    keys = np.asarray(keys, dtype=outpoint_key_dtype)
+    found = np.zeros(len(keys), dtype=bool)
+    chunk_offsets = np.zeros(len(keys), dtype=np.uint32)
+    positions = np.zeros(len(keys), dtype=np.uint32)
+
+    candidates = np.flatnonzero(test_bloom_filters(blooms, keys))
+    indices = np.searchsorted(table, keys[candidates])
+    in_range = indices < len(table)
+    candidates, indices = candidates[in_range], indices[in_range]
+    is_match = table[indices] == keys[candidates]
+    candidates, indices = candidates[is_match], indices[is_match]
+    rows = locations[indices]
+    found[candidates] = True
+    chunk_offsets[candidates] = rows['chunk_offset']
+    positions[candidates] = rows['position']
+    return found, chunk_offsets, positions
@@ -0,0 +1,56 @@
+""" This module holds the estimation of the script type histogram of a snapshot from a random sample of its chunks.
+
+    Chunks are sampled as a whole, i.e., as clusters of UTXOs. The number of UTXOs of every chunk is cheaply read from
+    its header, hence the count of each script type is estimated from its share among the sampled UTXOs, scaled to the
+    number of UTXOs of the whole snapshot (ratio estimator). """
+
+import random
+from math import sqrt
+from statistics import NormalDist
+
+from lib import utxo
+
+
+def sample_chunks(num_chunks, fraction, seed=None):
+    """ Returns the sorted indices of a random sample of about fraction of num_chunks chunks.
+
+        At least two chunks are sampled (if available), as the variance of the estimates cannot be derived otherwise. """
+    num_samples = min(num_chunks, max(2, round(fraction * num_chunks)))
+    return sorted(random.Random(seed).sample(range(num_chunks), num_samples))
+
+
+def estimate_histogram(histograms, sampled_num_utxos, chunk_num_utxos, confidence=0.95):
+    """ Returns one (script_type, sampled, estimate, standard_error, ci_lower, ci_upper) row per script type.
+
+        histograms and sampled_num_utxos hold the histogram and number of UTXOs of each sampled chunk, chunk_num_utxos
+        the number of UTXOs of all chunks of the snapshot. The confidence interval is the normal approximation for the
+        given confidence level, clipped to the range of counts that are possible given the sample. """
+    num_chunks = len(chunk_num_utxos)
+    num_samples = len(histograms)
+    num_utxos = sum(chunk_num_utxos)
+    num_utxos_sampled = sum(sampled_num_utxos)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    rows = list()
+    for script_type in utxo.ScriptType:
+        counts = [histogram.get(script_type, 0) for histogram in histograms]
+        sampled = sum(counts)
+        ratio = sampled / num_utxos_sampled if num_utxos_sampled else 0.
+        estimate = ratio * num_utxos
+        standard_error = 0.
+        if num_samples < num_chunks:
+            residuals = sum((count - ratio * m)**2 for count, m in zip(counts, sampled_num_utxos)) / (num_samples - 1)
+            standard_error = num_chunks * sqrt((1 - num_samples / num_chunks) * residuals / num_samples)
+        ci_lower = max(sampled, estimate - z * standard_error)
+        ci_upper = min(num_utxos - (num_utxos_sampled - sampled), estimate + z * standard_error)
+        rows.append((script_type, sampled, estimate, standard_error, ci_lower, ci_upper))
+    return rows
+
+
+def print_histogram_estimate_header(file_out=None):
+    print('script_type;sampled;estimate;standard_error;ci_lower;ci_upper', file=file_out)
+
+
+def print_histogram_estimate(rows, file_out=None):
+    for script_type, sampled, estimate, standard_error, ci_lower, ci_upper in rows:
+        print(f'{utxo.scripttype_labels[script_type][0]};{sampled};{round(estimate)};{standard_error:.1f};{round(ci_lower)};{round(ci_upper)}', file=file_out)
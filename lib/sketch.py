@@ -0,0 +1,203 @@
+""" This module holds mergeable sketches, which estimate statistics of script payloads in bounded memory.
+
+    All sketches operate on 64-bit hashes of the payloads (see get_payloads and hash_segments) and can be merged with sketches
+    of the same parameters, e.g., to combine partial results of different worker processes. """
+
+from math import ceil, e, log, log2, sqrt
+
+import numpy as np
+
+from lib import utxo
+
+
+# Random keys of the payload hash, fixed such that hashes are comparable across processes and runs
+HASH_POSITIONS = 1024
+hash_keys = np.random.default_rng(0x636f696e7072756e).integers(0, 2**64, size=256 + HASH_POSITIONS, dtype=np.uint64, endpoint=False)
+hash_byte_keys = hash_keys[:256]
+hash_position_keys = hash_keys[256:] | np.uint64(1)
+
+
+def mix64(x):
+    """ The SplitMix64 finalizer, applied to an array of uint64 hashes. """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_segments(buffer, starts, ends):
+    """ Returns 64-bit hashes of the byte segments buffer[starts[i]:ends[i]] at once. """
+    lengths = (ends - starts).astype(np.int64)
+    segment_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=segment_offsets[1:])
+    positions = np.arange(segment_offsets[-1]) - np.repeat(segment_offsets[:-1], lengths)
+    data = buffer[np.repeat(starts, lengths) + positions]
+    with np.errstate(over='ignore'):
+        terms = hash_byte_keys[data] * hash_position_keys[positions % HASH_POSITIONS]
+        hashes = np.zeros(len(lengths), dtype=np.uint64)
+        is_nonempty = lengths > 0
+        hashes[is_nonempty] = np.add.reduceat(terms, segment_offsets[:-1][is_nonempty]) if len(terms) else 0
+        return mix64(hashes ^ (lengths.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)))
+
+
+# Script types, for which utxo.get_script_payload_uncompressed returns a payload
+payload_script_types = [
+    utxo.ScriptType.P2PKH, utxo.ScriptType.P2SH, utxo.ScriptType.P2PK_COMP, utxo.ScriptType.P2PK_NONC,
+    utxo.ScriptType.P2WPKH, utxo.ScriptType.P2WSH] + [t for t in utxo.ScriptType if utxo.ScriptType.P2MS_1_1 <= t <= utxo.ScriptType.P2MS_3_3]
+
+
+def get_payloads(utxos, script_types, is_obfuscated_snapshot=False):
+    """ Returns (buffer, starts, ends) such that buffer[starts[i]:ends[i]] is the payload of the i-th UTXO of the
+        given ChunkColumns, as returned by utxo.get_script_payload_compressed. Only for native SegWit scripts, the
+        payload is the witness program itself, without the push opcode that get_script_payload_compressed includes.
+
+        Scripts without payload are represented by their whole compressed script instead. """
+    script_starts = utxos.script_offsets[:-1]
+    script_ends = utxos.script_offsets[1:]
+    table = utxo.compressed_script_types_obfuscated if is_obfuscated_snapshot else utxo.compressed_script_types
+    is_compressed = table[utxos.scripts[script_starts]] >= 0 if len(script_starts) else np.zeros(0, dtype=bool)
+    is_segwit = ~is_compressed & ((script_types == utxo.ScriptType.P2WPKH) | (script_types == utxo.ScriptType.P2WSH))
+
+    # Compressed scripts hold the payload after the size byte, native SegWit scripts after the size, version and push
+    starts = np.array(script_starts, dtype=np.int64)
+    starts[is_compressed] += 1
+    starts[is_segwit] += 3
+    ends = np.array(script_ends, dtype=np.int64)
+
+    # Only the remaining script types with a payload have to be extracted one by one
+    extra = list()
+    extra_offset = len(utxos.scripts)
+    for i in np.flatnonzero(~is_compressed & ~is_segwit & np.isin(script_types, payload_script_types)):
+        payload = utxo.get_script_payload_compressed(utxos.get_script(i), is_obfuscated_snapshot=is_obfuscated_snapshot)
+        if isinstance(payload, list):
+            payload = b''.join(payload)
+        if not payload:
+            continue
+        extra.append(payload)
+        starts[i] = extra_offset
+        ends[i] = extra_offset + len(payload)
+        extra_offset += len(payload)
+
+    buffer = np.concatenate((np.asarray(utxos.scripts), np.frombuffer(b''.join(extra), dtype=np.uint8))) if extra else np.asarray(utxos.scripts)
+    return buffer, starts, ends
+
+
+def get_bit_lengths(x):
+    """ Returns the exact bit lengths of an array of uint64 values. """
+    x = x.copy()
+    res = np.zeros(len(x), dtype=np.int64)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        is_larger = x >= (np.uint64(1) << np.uint64(shift))
+        x[is_larger] >>= np.uint64(shift)
+        res[is_larger] += shift
+    return res + (x > 0)
+
+
+class HyperLogLog:
+    """ Estimates the number of distinct hashes with a relative standard error of about error. """
+
+    def __init__(self, error=0.01):
+        self.precision = min(max(4, ceil(log2((1.04 / error)**2))), 18)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def error(self):
+        return 1.04 / sqrt(len(self.registers))
+
+    def update(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        num_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(num_bits)).astype(np.int64)
+        ranks = num_bits - get_bit_lengths(hashes & np.uint64((1 << num_bits) - 1)) + 1
+        np.maximum.at(self.registers, indices, ranks.astype(np.uint8))
+
+    def merge(self, other):
+        assert self.precision == other.precision
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        num_zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and num_zeros:
+            estimate = m * log(m / num_zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """ Estimates the total weight per hash, overestimating it by at most epsilon times the total weight of all hashes
+        with probability 1 - delta. """
+
+    def __init__(self, epsilon=1e-5, delta=0.01):
+        self.width = ceil(e / epsilon)
+        self.depth = ceil(log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.uint64)
+        self.total = 0
+
+    def get_columns(self, hashes):
+        with np.errstate(over='ignore'):
+            return [(mix64(hashes + np.uint64(row + 1) * np.uint64(0x9E3779B97F4A7C15)) % np.uint64(self.width)).astype(np.int64) for row in range(self.depth)]
+
+    def update(self, hashes, weights):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        # Sums of weights within a chunk stay below 2^53, hence they are exact as float64
+        for row, columns in enumerate(self.get_columns(hashes)):
+            self.table[row] += np.bincount(columns, weights=weights, minlength=self.width).astype(np.uint64)
+        self.total += int(np.sum(weights, dtype=np.uint64))
+
+    def merge(self, other):
+        assert self.table.shape == other.table.shape
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def estimate(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        estimates = [self.table[row][columns] for row, columns in enumerate(self.get_columns(hashes))]
+        return np.min(estimates, axis=0) if estimates else np.zeros(len(hashes), dtype=np.uint64)
+
+
+class HeavyHitters:
+    """ Tracks the k hashes of the largest estimated weight, using a CountMinSketch for the estimates.
+
+        Candidates are kept with a representative payload, which allows to report them. """
+
+    def __init__(self, k=20, epsilon=1e-5, delta=0.01):
+        self.k = k
+        self.sketch = CountMinSketch(epsilon=epsilon, delta=delta)
+        self.candidates = dict()
+
+    def update(self, hashes, weights, get_payload):
+        """ Adds the weights of the hashes, where get_payload(i) returns the payload of the i-th hash. """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        self.sketch.update(hashes, weights)
+        unique_hashes, indices = np.unique(hashes, return_index=True)
+        new = dict(zip(unique_hashes.tolist(), indices.tolist()))
+        self.prune(new, get_payload)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.prune(other.candidates, lambda payload: payload)
+        return self
+
+    def prune(self, new, get_payload):
+        """ Keeps the k candidates of largest estimate among the current ones and the new ones. """
+        hashes = np.array(list(self.candidates) + [h for h in new if h not in self.candidates], dtype=np.uint64)
+        estimates = self.sketch.estimate(hashes)
+        if len(hashes) > self.k:
+            top = np.argpartition(-estimates.astype(np.float64), self.k - 1)[:self.k]
+            hashes, estimates = hashes[top], estimates[top]
+        candidates = dict()
+        for h in hashes.tolist():
+            candidates[h] = self.candidates[h] if h in self.candidates else get_payload(new[h])
+        self.candidates = candidates
+
+    def top(self):
+        """ Returns the (hash, payload, estimate) of all candidates, by descending estimate. """
+        hashes = np.array(list(self.candidates), dtype=np.uint64)
+        estimates = self.sketch.estimate(hashes).tolist()
+        return sorted(((h, self.candidates[h], v) for h, v in zip(hashes.tolist(), estimates)), key=lambda t: -t[2])
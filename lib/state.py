@@ -0,0 +1,41 @@
+""" This module holds the reading and writing of snapshot state files. """
+
+from lib import base
+
+
+def read_snapshot_height_file(file_handler):
+    return base.read_int_file(file_handler)
+
+
+def write_snapshot_height_file(file_handler, snapshot_height):
+    base.write_int_file(file_handler, snapshot_height)
+
+
+def read_block_hash_file(file_handler):
+    return file_handler.read(32)[::-1]
+
+
+def write_block_hash_file(file_handler, block_hash_bin):
+    file_handler.write(block_hash_bin[::-1])
+
+
+def read_num_chunks_file(file_handler):
+    return base.read_int_file(file_handler)
+
+
+def write_num_chunks_file(file_handler, num_chunks):
+    base.write_int_file(file_handler, num_chunks)
+
+
+def read_snapshot_file(file_handler):
+    snapshot_height = read_snapshot_height_file(file_handler)
+    block_hash = read_block_hash_file(file_handler)
+    num_chunks = read_num_chunks_file(file_handler)
+
+    return (snapshot_height, block_hash, num_chunks)
+
+
+def write_snapshot_file(file_handler, snapshot_height, block_hash, num_chunks):
+    write_snapshot_height_file(file_handler, snapshot_height)
+    write_block_hash_file(file_handler, block_hash)
+    write_num_chunks_file(file_handler, num_chunks)
@@ -4,8 +4,8 @@
 import sys
 import enum
 import logging
-from binascii import hexlify, unhexlify
-from math import floor
+from binascii import hexlify
+import numpy as np
 from ecdsa.util import string_to_number
 
 from btcpy.structs.script import Script
@@ -190,6 +190,40 @@ def classify_compressed_script(script, is_obfuscated_snapshot=False):
     return res, is_compressed
 
 
+# The first byte of a compressed script alone determines the type of compressed scripts, see classify_compressed_script
+compressed_script_types = np.full(256, -1, dtype=np.int16)
+compressed_script_types[[0x00, 0x01, 0x02, 0x03, 0x04, 0x05]] = [
+    ScriptType.P2PKH, ScriptType.P2SH, ScriptType.P2PK_COMP, ScriptType.P2PK_COMP, ScriptType.P2PK_NONC, ScriptType.P2PK_NONC]
+compressed_script_types_obfuscated = compressed_script_types.copy()
+compressed_script_types_obfuscated[[0x06, 0x07, 0x08, 0x09]] = [
+    ScriptType.CoinpruneP2PKH, ScriptType.CoinpruneP2SH, ScriptType.CoinpruneP2WPKH, ScriptType.CoinpruneP2WSH]
+
+
+def classify_compressed_scripts(scripts, script_offsets, is_obfuscated_snapshot=False):
+    """ Batch version of classify_compressed_script for a script buffer and offsets as in ChunkColumns.
+
+        Returns an array of ScriptType values. Only uncompressed scripts fall back to per-script classification. """
+    table = compressed_script_types_obfuscated if is_obfuscated_snapshot else compressed_script_types
+    starts = script_offsets[:-1]
+    script_types = table[scripts[starts]]
+
+    # Native SegWit scripts are stored uncompressed, but are common enough to also be matched on array level
+    lengths = np.diff(script_offsets)
+    candidates = (script_types < 0) & (scripts[starts] < 0x80) & ((lengths == 1 + 22) | (lengths == 1 + 34))
+    indices = np.flatnonzero(candidates)
+    witness_version = scripts[starts[indices] + 1]
+    program_length = scripts[starts[indices] + 2]
+    is_p2wpkh = (witness_version == 0x00) & (program_length == 20) & (lengths[indices] == 1 + 22)
+    is_p2wsh = (witness_version == 0x00) & (program_length == 32) & (lengths[indices] == 1 + 34)
+    script_types[indices[is_p2wpkh]] = ScriptType.P2WPKH
+    script_types[indices[is_p2wsh]] = ScriptType.P2WSH
+
+    for i in np.flatnonzero(script_types < 0):
+        script = scripts[script_offsets[i]:script_offsets[i + 1]].tobytes()
+        script_types[i], _ = classify_compressed_script(script, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    return script_types
+
+
 def classify_script(script, compressed=False, is_obfuscated_snapshot=False):
     return classify_compressed_script(script, is_obfuscated_snapshot=is_obfuscated_snapshot) if compressed else (classify_uncompressed_script(script), False)
 
@@ -219,11 +253,12 @@ def get_script_payload_uncompressed(script):
     elif script_type == ScriptType.P2WSH:
         return script[1:33]
     elif ScriptType.P2MS_1_1 <= script_type <= ScriptType.P2MS_3_3:
-        n = base.read_charint(script[-2])
+        # The number of public keys is pushed as OP_1 to OP_16 right before OP_CHECKMULTISIG
+        n = script[-2] - 0x50
         offset = 1
         payloads = list()
         for _ in range(n):
-            payload_length = base.read_charint(script[offset])
+            payload_length = script[offset]
             new_offset = offset + 1 + payload_length
             payloads.append(script[(offset + 1):new_offset])
             offset = new_offset
@@ -405,25 +440,21 @@ def obfuscate_compressed_script_file(file_handler, script):
 
 # TxOut Value Handling
 
+# See bitcoin core amount.h
+MAX_MONEY = 21000000 * 10**8
+
 
 # See bitcoin core compressor.cpp:169
 def decompress_value(v):
     if v == 0:
         return 0
-    v -= 1
-    e = v % 10
-    v = int(floor(v / 10))
-    n = 0
+    v, e = divmod(v - 1, 10)
     if e < 9:
-        d = (v % 9) + 1
-        v = int(floor(v / 9))
-        n = v * 10 + d
+        v, d = divmod(v, 9)
+        n = v * 10 + d + 1
     else:
         n = v + 1
-    while e > 0:
-        n *= 10
-        e -= 1
-    return n
+    return n * 10**e
 
 
 # See src/compressor.cpp:150
@@ -432,17 +463,52 @@ def compress_value(v):
         return 0
     e = 0
     while ((v % 10) == 0) and e < 9:
-        v /= 10
+        v //= 10
         e += 1
     if e < 9:
-        d = v % 10
+        v, d = divmod(v, 10)
         assert 1 <= d <= 9
-        v /= 10
         return 1 + (((v * 9) + d - 1) * 10) + e
     else:
         return 1 + ((v - 1) * 10) + 9
 
 
+powers_of_ten = np.array([10**e for e in range(10)], dtype=np.uint64)
+
+
+def decompress_values(values):
+    """ Batch version of decompress_value for an array of compressed values.
+
+        Only valid for compressed values of amounts up to MAX_MONEY, see compress_values. """
+    values = np.asarray(values, dtype=np.uint64)
+    v, e = np.divmod(np.maximum(values, 1) - np.uint64(1), np.uint64(10))
+    q, d = np.divmod(v, np.uint64(9))
+    n = np.where(e < 9, q * np.uint64(10) + d + np.uint64(1), v + np.uint64(1)) * powers_of_ten[e]
+    n[values == 0] = 0
+    return n
+
+
+def compress_values(values):
+    """ Batch version of compress_value for an array of values.
+
+        Only valid for values up to MAX_MONEY: the compressed values of amounts from about 9 * 10^18 on exceed uint64,
+        hence they wrap around here, and decompress_values raises an OverflowError for their exact compressed values
+        (as returned by compress_value). """
+    values = np.asarray(values, dtype=np.uint64)
+    n = values.copy()
+    e = np.zeros(len(values), dtype=np.uint64)
+    for _ in range(9):
+        is_divisible = (n % np.uint64(10) == 0) & (n != 0)
+        n[is_divisible] //= np.uint64(10)
+        e[is_divisible] += np.uint64(1)
+    q, d = np.divmod(n, np.uint64(10))
+    # Unsigned wrap-arounds only occur in the discarded branches of the following selections
+    with np.errstate(over='ignore'):
+        res = np.where(e < 9, np.uint64(1) + (q * np.uint64(9) + d - np.uint64(1)) * np.uint64(10) + e, np.uint64(1) + (n - np.uint64(1)) * np.uint64(10) + np.uint64(9))
+    res[values == 0] = 0
+    return res
+
+
 # Full TxOuts
 
 def read_txout(data, decompress=False):
@@ -500,8 +566,14 @@ def write_coin_file(file_handler, coin):
 
 # UTXO Outpoint
 
+def get_txid_hex(txid):
+    """ Converts a serialized (little-endian) txid, as held in outpoints, to its usual hex representation. """
+    return hexlify(txid[::-1]).decode()
+
+
 def read_outpoint(data):
-    res_hash = hexlify(data[:32][::-1])
+    """ Returns (txid, n), where the txid is kept serialized. Use get_txid_hex to display it. """
+    res_hash = data[:32]
     res_n = base.read_int(data[32:(32 + 4)])
     return res_hash, res_n
 
@@ -513,7 +585,7 @@ def read_outpoint_file(file_handler):
 
 def write_outpoint(outpoint):
     outpoint_hash, outpoint_n = outpoint
-    serialized_hash = unhexlify(outpoint_hash)[::-1]
+    serialized_hash = outpoint_hash
     serialized_n = base.write_int(outpoint_n)
     return serialized_hash + serialized_n
 
@@ -522,30 +594,155 @@ def write_outpoint_file(file_handler, outpoint):
     file_handler.write(write_outpoint(outpoint))
 
 
+# Chunk columns
+
+class ChunkColumns:
+    """ Columnar representation of the UTXOs of a single chunk.
+
+        Fixed-width fields are held in NumPy arrays, txids in their serialized (little-endian) byte order. All scripts
+        (as returned by read_script_file) share a single byte buffer, such that the script of the i-th UTXO is
+        scripts[script_offsets[i]:script_offsets[i + 1]]. Indexing or iterating yields the same
+        ((txid, n), (block_height, (script, value), is_coinbase)) rows as read_outpoint_file and read_coin_file. """
+
+    def __init__(self, txid, vout, height, is_coinbase, value, scripts, script_offsets):
+        self.txid = txid
+        self.vout = vout
+        self.height = height
+        self.is_coinbase = is_coinbase
+        self.value = value
+        self.scripts = scripts
+        self.script_offsets = script_offsets
+
+    def __len__(self):
+        return len(self.vout)
+
+    def get_script(self, i):
+        return self.scripts[self.script_offsets[i]:self.script_offsets[i + 1]].tobytes()
+
+    def get_row(self, i):
+        outpoint = (self.txid[i].tobytes(), int(self.vout[i]))
+        txout = (self.get_script(i), int(self.value[i]))
+        return (outpoint, (int(self.height[i]), txout, int(self.is_coinbase[i])))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.get_row(i) for i in range(*key.indices(len(self)))]
+        # Negative indices count from the end as for lists, get_row would pick a wrong script range otherwise
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('ChunkColumns index out of range')
+        return self.get_row(key)
+
+    def __iter__(self):
+        # Convert whole columns at once instead of each element separately
+        txids = self.txid.tobytes()
+        scripts = self.scripts.tobytes()
+        script_offsets = self.script_offsets.tolist()
+        columns = zip(self.vout.tolist(), self.height.tolist(), self.is_coinbase.tolist(), self.value.tolist())
+        for i, (n, block_height, is_coinbase, value) in enumerate(columns):
+            outpoint = (txids[(32 * i):(32 * (i + 1))], n)
+            txout = (scripts[script_offsets[i]:script_offsets[i + 1]], value)
+            yield (outpoint, (block_height, txout, is_coinbase))
+
+
+def get_compressed_script_lengths(is_obfuscated_snapshot=False):
+    """ Returns the serialized length of compressed scripts by their first byte, or -1 for multi-byte sizes. """
+    lengths = list()
+    for size in range(0x80):
+        if size < SPECIAL_SCRIPTS:
+            lengths.append(1 + (20 if size in [0, 1] else 32))
+        elif is_obfuscated_snapshot and size < SPECIAL_SCRIPTS + 4:
+            lengths.append(1 + 32)
+        else:
+            lengths.append(1 + size - (SPECIAL_SCRIPTS + (4 if is_obfuscated_snapshot else 0)))
+    return lengths + [-1] * 0x80
+
+
+compressed_script_lengths = get_compressed_script_lengths()
+compressed_script_lengths_obfuscated = get_compressed_script_lengths(is_obfuscated_snapshot=True)
+
+
+def get_utxo_offsets(data, offset, num_utxos, is_obfuscated_snapshot=False):
+    """ Returns the num_utxos + 1 boundaries of consecutive serialized UTXOs in a bytes-like buffer, starting at
+        offset, as an array.
+
+        Only the script sizes are decoded, using the same size rules as read_script_file, and all other fields are
+        skipped. This is several times faster than decoding the UTXOs. """
+    script_lengths = compressed_script_lengths_obfuscated if is_obfuscated_snapshot else compressed_script_lengths
+    offsets = [0] * (num_utxos + 1)
+    offsets[0] = offset
+    for i in range(1, num_utxos + 1):
+        # Skip the outpoint, and the code and compressed value VARINTs
+        offset += 32 + 4
+        while data[offset] > 0x7F:
+            offset += 1
+        offset += 1
+        while data[offset] > 0x7F:
+            offset += 1
+        offset += 1
+
+        length = script_lengths[data[offset]]
+        if length < 0:
+            size, offset = base.read_varint(data, offset)
+            length = size - (SPECIAL_SCRIPTS + (4 if is_obfuscated_snapshot else 0))
+        offset += length
+        offsets[i] = offset
+    return np.array(offsets, dtype=np.int64)
+
+
+def read_chunk_columns(data, offset, num_utxos, is_obfuscated_snapshot=False):
+    """ Parses num_utxos consecutive UTXOs from a bytes-like buffer, starting at offset, into ChunkColumns.
+
+        The UTXO boundaries are found by get_utxo_offsets, all fields are then decoded for all UTXOs at once. """
+    utxo_offsets = get_utxo_offsets(data, offset, num_utxos, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    utxo_starts = utxo_offsets[:-1]
+    codes, value_starts = base.read_varints_at(data, utxo_starts + 32 + 4)
+    values, script_starts = base.read_varints_at(data, value_starts)
+
+    # Gather the fixed-width fields and the scripts from the buffer at once
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    txid = buffer[utxo_starts[:, None] + np.arange(32)]
+    vout = buffer[(utxo_starts + 32)[:, None] + np.arange(4)].view('<u4').reshape(-1)
+
+    script_lengths = utxo_offsets[1:] - script_starts
+    script_offsets = np.zeros(num_utxos + 1, dtype=np.int64)
+    np.cumsum(script_lengths, out=script_offsets[1:])
+    scripts = buffer[np.repeat(script_starts - script_offsets[:-1], script_lengths) + np.arange(script_offsets[-1])]
+
+    height = (codes >> np.uint64(1)).astype(np.uint32)
+    is_coinbase = (codes & np.uint64(1)).astype(np.uint8)
+    value = decompress_values(values)
+
+    return ChunkColumns(txid, vout, height, is_coinbase, value, scripts, script_offsets)
+
+
 # UTXO Histogram
 
-def get_utxo_histogram(utxos, is_obfuscated_snapshot=False):
-    histogram = dict()
-    other = list()
-    for i, utxo in enumerate(utxos):
-        outpoint, coin = utxo[0], utxo[1]
-        script = coin[1][0]
+def get_utxo_histogram(utxos, is_obfuscated_snapshot=False, script_types=None):
+    """ Returns the histogram of script types and the "other" UTXOs of the given ChunkColumns.
 
-        script_type, _ = classify_script(script, compressed=True, is_obfuscated_snapshot=is_obfuscated_snapshot)
-        if script_type not in histogram.keys():
-            histogram[script_type] = 0
-        histogram[script_type] += 1
+        The script types are classified, unless they are given already (see classify_compressed_scripts). """
+    if script_types is None:
+        script_types = classify_compressed_scripts(utxos.scripts, utxos.script_offsets, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    counts = np.bincount(script_types, minlength=ScriptType.OTHER + 1)
+    histogram = {ScriptType(script_type): int(counts[script_type]) for script_type in np.flatnonzero(counts)}
 
-        if script_type >= 200:
-            other.append((outpoint[0], outpoint[1], scripttype_labels[script_type][0], script))
+    other = list()
+    for i in np.flatnonzero(script_types >= 200):
+        outpoint, coin = utxos[i]
+        script_type = ScriptType(script_types[i])
+        other.append((outpoint[0], outpoint[1], scripttype_labels[script_type][0], coin[1][0]))
 
     return histogram, other
 
 
-def print_utxo_histogram_header(file_out=None):
+def print_utxo_histogram_header(file_out=None, chunk_hash=False):
     if file_out is None:
         file_out = sys.stdout
     csv_header = 'chunk_height;chunk_offset'
+    if chunk_hash:
+        csv_header += ';chunk_hash'
     for k in ScriptType._member_names_:
         csv_header += f';{scripttype_labels[ScriptType[k]][0]}'
     print(f'{csv_header}', file=file_out)
@@ -555,11 +752,13 @@ def print_utxo_other_header(file_out=None):
     print('chunk_height;chunk_offset;txid;tx_index;script_type;script', file=file_out)
 
 
-def print_utxo_histogram(histogram, chunk_height, chunk_offset, file_out=None, machine=False):
+def print_utxo_histogram(histogram, chunk_height, chunk_offset, file_out=None, machine=False, chunk_hash=None):
     if file_out is None:
         file_out = sys.stdout
     if machine:
         csv_line = f'{chunk_height};{chunk_offset}'
+        if chunk_hash is not None:
+            csv_line += f';{chunk_hash}'
         for k in ScriptType._member_names_:
             v = histogram[ScriptType[k]] if ScriptType[k] in histogram.keys() else 0
             csv_line += f';{v}'
@@ -569,6 +768,16 @@ def print_utxo_histogram(histogram, chunk_height, chunk_offset, file_out=None, m
             print(f'{scripttype_labels[k][1]}: {histogram[k]}', file=file_out)
 
 
+def read_utxo_histograms(file_in):
+    """ Yields the (chunk_height, chunk_offset, histogram) rows of a histogram CSV file, see print_utxo_histogram. """
+    header = file_in.readline().rstrip('\n').split(';')
+    script_types = {v[0]: k for k, v in scripttype_labels.items()}
+    for line in file_in:
+        values = dict(zip(header, line.rstrip('\n').split(';')))
+        histogram = {script_types[k]: int(v) for k, v in values.items() if k in script_types and int(v)}
+        yield int(values['chunk_height']), int(values['chunk_offset']), histogram
+
+
 def print_other_utxos(other, chunk_height, chunk_offset, file_out=None, machine=False):
     if file_out is None:
         file_out = sys.stderr
@@ -578,7 +787,7 @@ def print_other_utxos(other, chunk_height, chunk_offset, file_out=None, machine=
         print()
     for o in other:
         if machine:
-            other_str = f'{chunk_height};{chunk_offset};{o[0].decode()};{o[1]};{o[2]};{Script.unhexlify(hexlify(o[3])).decompile()}'
+            other_str = f'{chunk_height};{chunk_offset};{get_txid_hex(o[0])};{o[1]};{o[2]};{Script.unhexlify(hexlify(o[3])).decompile()}'
         else:
-            other_str = f'({o[0].decode()}, {o[1]}): {Script.unhexlify(hexlify(o[3])).decompile()} ({o[2]})'
+            other_str = f'({get_txid_hex(o[0])}, {o[1]}): {Script.unhexlify(hexlify(o[3])).decompile()} ({o[2]})'
         print(other_str, file=file_out)
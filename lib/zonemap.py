@@ -0,0 +1,88 @@
+""" This module holds the zone map, a sidecar index with per-chunk summaries of a snapshot.
+
+    Queries use the zone map to skip chunks that cannot contain any matching UTXO, and totals such as histograms can
+    be answered from the zone map alone. """
+
+import os
+
+import numpy as np
+
+from lib import chunk, utxo
+
+
+# Script type counts are stored in the order of the ScriptType members, as in the histogram CSV files
+SCRIPT_TYPES = [utxo.ScriptType[k] for k in utxo.ScriptType._member_names_]
+
+zone_map_dtype = np.dtype([
+    ('filename', 'S64'),
+    ('chunk_height', '<u4'),
+    ('chunk_offset', '<u4'),
+    ('chunk_size', '<u4'),
+    ('num_utxos', '<u4'),
+    ('min_height', '<u4'),
+    ('max_height', '<u4'),
+    ('total_value', '<u8'),
+    ('script_types', '<u4', (len(SCRIPT_TYPES),)),
+    ('chunk_hash', 'S64'),
+    ('content_hash', 'S64'),
+    # Script types are classified differently in obfuscated snapshots, see read_zone_map
+    ('is_obfuscated_snapshot', '?'),
+])
+
+
+def get_zone_map_filename(folder, snapshot_height):
+    return f'{folder}/{snapshot_height:010d}.zonemap.npy'
+
+
+def get_chunk_zone(chunk_filename, data, is_obfuscated_snapshot=False):
+    """ Summarizes a single chunk, given its file name and data, as a record of zone_map_dtype. """
+    chunk_height, chunk_offset, chunk_num_utxos, utxos = chunk.parse_chunk(data, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    script_types = utxo.classify_compressed_scripts(utxos.scripts, utxos.script_offsets, is_obfuscated_snapshot=is_obfuscated_snapshot)
+    counts = np.bincount(script_types, minlength=utxo.ScriptType.OTHER + 1)
+
+    zone = np.zeros(1, dtype=zone_map_dtype)[0]
+    zone['filename'] = os.path.basename(chunk_filename).encode()
+    zone['chunk_height'] = chunk_height
+    zone['chunk_offset'] = chunk_offset
+    zone['chunk_size'] = len(data)
+    zone['num_utxos'] = chunk_num_utxos
+    zone['min_height'] = utxos.height.min() if chunk_num_utxos else 0
+    zone['max_height'] = utxos.height.max() if chunk_num_utxos else 0
+    zone['total_value'] = utxos.value.sum()
+    zone['script_types'] = counts[SCRIPT_TYPES]
+    zone['chunk_hash'] = chunk.get_chunk_hash(data).encode()
+    zone['content_hash'] = chunk.get_chunk_content_hash(data).encode()
+    zone['is_obfuscated_snapshot'] = is_obfuscated_snapshot
+    return zone
+
+
+def write_zone_map(filename, zones):
+    np.save(filename, np.array(zones, dtype=zone_map_dtype))
+
+
+def read_zone_map(filename, is_obfuscated_snapshot=None):
+    """ Returns the zone map as a memory-mapped structured array of zone_map_dtype.
+
+        Raises a ValueError if is_obfuscated_snapshot is given, but the zone map was built with the other setting (or
+        without recording it), as its script type counts would not match the classification of the caller. """
+    zone_map = np.load(filename, mmap_mode='r')
+    if is_obfuscated_snapshot is not None:
+        if 'is_obfuscated_snapshot' not in zone_map.dtype.names:
+            raise ValueError(f'Zone map {filename} does not record whether the snapshot is obfuscated, rebuild it')
+        if len(zone_map) and not (zone_map['is_obfuscated_snapshot'] == is_obfuscated_snapshot).all():
+            raise ValueError(f'Zone map {filename} was built {"without" if is_obfuscated_snapshot else "with"} --obfuscated-snapshot')
+    return zone_map
+
+
+def select_chunks(zone_map, min_height=None, max_height=None, script_types=None):
+    """ Returns a boolean mask of the chunks that may hold UTXOs created between min_height and max_height (inclusive)
+        and with any of the given script types. """
+    mask = np.ones(len(zone_map), dtype=bool)
+    if min_height is not None:
+        mask &= zone_map['max_height'] >= min_height
+    if max_height is not None:
+        mask &= zone_map['min_height'] <= max_height
+    if script_types is not None:
+        columns = [SCRIPT_TYPES.index(t) for t in script_types]
+        mask &= zone_map['script_types'][:, columns].sum(axis=1) > 0
+    return mask
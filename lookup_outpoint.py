@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+""" This script looks up whether outpoints are unspent in a snapshot, and in which chunk they are located.
+
+    Outpoints are given as txid:vout, either as arguments or line by line in a file, and the answers are printed as
+    CSV. The outpoint index has to be built via build_outpoint_index.py first. """
+
+import argparse
+from binascii import unhexlify
+
+import numpy as np
+
+from lib import outpointindex
+
+
+def parse_outpoint(outpoint):
+    txid, vout = outpoint.strip().split(':')
+    txid = unhexlify(txid)[::-1]
+    if len(txid) != 32:
+        raise ValueError(f'Invalid txid length: {len(txid)}')
+    return txid, int(vout)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot')
+    argparser.add_argument('outpoints', type=str, nargs='*', help='Outpoints to look up as txid:vout')
+    argparser.add_argument('--file', type=str, help='File holding one outpoint (txid:vout) per line', default=None)
+    args = argparser.parse_args()
+
+    outpoints = list(args.outpoints)
+    if args.file is not None:
+        with open(args.file, 'r') as f:
+            outpoints += [line for line in f if line.strip()]
+
+    try:
+        parsed = [parse_outpoint(o) for o in outpoints]
+    except ValueError as e:
+        argparser.error(f'Outpoints have to be given as txid:vout ({e})')
+    txids = np.frombuffer(b''.join(p[0] for p in parsed), dtype=np.uint8)
+    keys = outpointindex.get_outpoint_keys(txids, [p[1] for p in parsed])
+
+    table, locations, blooms = outpointindex.read_outpoint_index(args.folder, args.snapshot_height)
+    found, chunk_offsets, positions = outpointindex.lookup_outpoints(table, locations, blooms, keys)
+
+    print('txid;tx_index;unspent;chunk_offset;position')
+    for o, is_found, chunk_offset, position in zip(outpoints, found.tolist(), chunk_offsets.tolist(), positions.tolist()):
+        txid, vout = o.strip().split(':')
+        if is_found:
+            print(f'{txid};{vout};1;{chunk_offset};{position}')
+        else:
+            print(f'{txid};{vout};0;;')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+""" This script turns a plain snapshot into an obfuscated one.
+
+    Chunks are obfuscated by a pool of worker processes, which read the chunk files themselves, while the main process
+    collects the obfuscated UTXOs in snapshot order and writes them into new chunks of at most MAX_SIZE_CHUNK bytes.
+    As obfuscated scripts are larger, the new snapshot usually consists of more chunks than the plain one. """
+
+import os
+import argparse
+import collections
+import multiprocessing
+
+import progressbar
+
+from parse_snapshot import get_state_filename, get_chunk_filenames
+from parse_state_file import read_snapshot_file
+from lib import chunk
+from lib import utxo as utxo_handler
+
+
+def obfuscate_chunk_file(chunk_filename):
+    """ Returns the serialized obfuscated UTXOs of a plain chunk file. """
+    _, _, _, utxos = chunk.parse_chunk(chunk.read_chunk_file(chunk_filename))
+    entries = list()
+    for outpoint, (block_height, (script, value), is_coinbase) in utxos:
+        script_obfuscated, _, _ = utxo_handler.obfuscate_compressed_script(script)
+        coin = (block_height, (script_obfuscated, value), is_coinbase)
+        entries.append(utxo_handler.write_outpoint(outpoint) + utxo_handler.write_coin(coin))
+    return entries
+
+
+def imap_bounded(pool, func, iterable, max_pending):
+    """ Yields func of each item in submission order as Pool.imap, but with at most max_pending items submitted and
+        not yet consumed. Pool.imap submits all items at once and buffers their results until they are consumed, which
+        holds all results in memory if consuming them is slower than computing them. """
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) == max_pending:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (item,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding the state file and all chunks of the plain snapshot')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to obfuscate')
+    argparser.add_argument('target_folder', type=str, help='Folder to write the obfuscated snapshot to')
+    argparser.add_argument('--jobs', type=int, help='Number of worker processes obfuscating chunks in parallel', default=os.cpu_count())
+    argparser.add_argument('--overwrite', action='store_true', help='Replace a snapshot of the same height in target_folder')
+    args = argparser.parse_args()
+
+    if os.path.realpath(args.folder) == os.path.realpath(args.target_folder):
+        argparser.error('target_folder must differ from folder')
+
+    with open(get_state_filename(args.folder, args.snapshot_height), 'rb') as f:
+        state_height, block_hash, _ = read_snapshot_file(f)
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    try:
+        writer = chunk.ChunkWriter(args.target_folder, state_height, overwrite=args.overwrite)
+    except FileExistsError as e:
+        argparser.error(f'{e}, use --overwrite to replace it')
+    bar = progressbar.ProgressBar(max_value=len(filenames), redirect_stdout=True)
+
+    pool = multiprocessing.Pool(args.jobs)
+    # Results are yielded in submission order, hence UTXOs are written in the order of the plain snapshot. Writing is
+    # slower than obfuscating with many workers, hence only a few chunks per worker are in flight at any time
+    for i, chunk_entries in enumerate(imap_bounded(pool, obfuscate_chunk_file, filenames, 2 * args.jobs)):
+        writer.add_all(chunk_entries)
+        bar.update(i)
+    pool.close()
+    pool.join()
+    writer.close(block_hash)
@@ -21,18 +21,15 @@ log.addHandler(ch)
 
 def parse_chunk_file(filename, is_obfuscated_snapshot=False):
     log.debug('Parsing a single chunk file.')
-    chunk_utxos = list()
-    with open(filename, 'rb') as f:
-        chunk_height = chunk.read_chunk_height_file(f)
-        chunk_offset = chunk.read_chunk_offset_file(f)
-        chunk_num_utxos, offset = chunk.read_num_utxos_file(f)
-        log.debug(f'Number of UTXOs: {chunk_num_utxos}, File position starting UTXOs: {offset}, is obfuscated snapshot: {is_obfuscated_snapshot}')
-        f.seek(offset)
-        for i in range(chunk_num_utxos):
-            outpoint = utxo_handler.read_outpoint_file(f)
-            coin = utxo_handler.read_coin_file(f, is_obfuscated_snapshot=is_obfuscated_snapshot)
-            chunk_utxos.append((outpoint, coin))
-    return chunk_height, chunk_offset, chunk_num_utxos, chunk_utxos
+    data = chunk.read_chunk_file(filename)
+    return chunk.parse_chunk(data, is_obfuscated_snapshot=is_obfuscated_snapshot)
+
+
+def parse_chunk_file_with_hash(filename, is_obfuscated_snapshot=False):
+    """ Like parse_chunk_file, but additionally returns the chunk hash, computed from the same buffer. """
+    log.debug('Parsing and hashing a single chunk file.')
+    data = chunk.read_chunk_file(filename)
+    return chunk.parse_chunk(data, is_obfuscated_snapshot=is_obfuscated_snapshot) + (chunk.get_chunk_hash(data),)
 
 
 if __name__ == '__main__':
@@ -44,10 +41,7 @@ if __name__ == '__main__':
     argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Decode obfuscated chunk file')
     args = argparser.parse_args()
 
-    with open(args.filename, 'rb') as f:
-        chunk_hash = chunk.get_chunk_hash_file(f)
-
-    chunk_height, chunk_offset, chunk_num_utxos, utxos = parse_chunk_file(args.filename, args.obfuscated_snapshot)
+    chunk_height, chunk_offset, chunk_num_utxos, utxos, chunk_hash = parse_chunk_file_with_hash(args.filename, args.obfuscated_snapshot)
 
     if not args.machine:
         print(f'Chunk file name: {args.filename}')
@@ -68,7 +62,7 @@ if __name__ == '__main__':
             outpoint, coin = utxo[0], utxo[1]
             print('{:6d}: {}, {} ({}, {}, {})'.format(
                 ctr,
-                str(outpoint[0]),
+                utxo_handler.get_txid_hex(outpoint[0]),
                 str(outpoint[1]),
                 str(coin[0]),
                 str(coin[1]),
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+""" Stream all UTXOs of a snapshot chunk by chunk.
+
+    Only the chunk being processed and the next chunk, which is read ahead on a background thread, are held in memory,
+    independent of the size of the snapshot. """
+
+import glob
+import argparse
+import binascii
+from concurrent.futures import ThreadPoolExecutor
+
+from lib import chunk
+from lib.chunk import get_state_filename
+from parse_state_file import read_snapshot_file
+
+
+def get_chunk_filenames(folder, snapshot_height):
+    """ Returns the chunk files of a snapshot in (chunk_height, chunk_offset) order. """
+    return sorted(glob.glob(f'{folder}/chunks/{snapshot_height:010d}_**.chunk'))
+
+
+def read_chunk_files(filenames):
+    """ Yields (filename, data) for the given chunk files, while the next file is read on a background thread. """
+    filenames = list(filenames)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(chunk.read_chunk_file, filenames[0]) if filenames else None
+        for i, filename in enumerate(filenames):
+            data = future.result()
+            if i + 1 < len(filenames):
+                future = executor.submit(chunk.read_chunk_file, filenames[i + 1])
+            yield filename, data
+
+
+def iter_snapshot(folder, snapshot_height, is_obfuscated_snapshot=False, filenames=None, with_hash=False):
+    """ Yields one (chunk_height, chunk_offset, chunk_num_utxos, utxos) batch per chunk, where utxos are
+        utxo.ChunkColumns. If with_hash is set, the chunk hash is appended, computed from the same buffer.
+
+        Chunks are processed in (chunk_height, chunk_offset) order, or in the order of the given chunk filenames. """
+    if filenames is None:
+        filenames = get_chunk_filenames(folder, snapshot_height)
+    for _, data in read_chunk_files(filenames):
+        res = chunk.parse_chunk(data, is_obfuscated_snapshot=is_obfuscated_snapshot)
+        yield (res + (chunk.get_chunk_hash(data),)) if with_hash else res
+
+
+def iter_snapshot_utxos(folder, snapshot_height, is_obfuscated_snapshot=False):
+    """ Yields all UTXOs of a snapshot as (outpoint, coin) rows, see utxo.ChunkColumns. """
+    for _, _, _, utxos in iter_snapshot(folder, snapshot_height, is_obfuscated_snapshot=is_obfuscated_snapshot):
+        yield from utxos
+
+
+if __name__ == '__main__':
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding the state file and all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to load')
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Decode obfuscated chunk files')
+    args = argparser.parse_args()
+
+    with open(get_state_filename(args.folder, args.snapshot_height), 'rb') as f:
+        state_height, state_latest_block_hash, state_num_chunks = read_snapshot_file(f)
+
+    num_utxos = 0
+    total_value = 0
+    for _, _, chunk_num_utxos, utxos in iter_snapshot(args.folder, args.snapshot_height, is_obfuscated_snapshot=args.obfuscated_snapshot):
+        num_utxos += chunk_num_utxos
+        total_value += sum(utxos.value.tolist())
+
+    print('State block height: {}'.format(state_height))
+    print('Latest block hash: {}'.format(binascii.hexlify(state_latest_block_hash).decode()))
+    print('Number chunks: {}'.format(state_num_chunks))
+    print('Number UTXOs: {}'.format(num_utxos))
+    print('Total value: {}'.format(total_value))
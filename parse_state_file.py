@@ -4,45 +4,10 @@
 import argparse
 import binascii
 
-from lib import base
-
-
-def read_snapshot_height_file(file_handler):
-    return base.read_int_file(file_handler)
-
-
-def write_snapshot_height_file(file_handler, snapshot_height):
-    base.write_int_file(file_handler, snapshot_height)
-
-
-def read_block_hash_file(file_handler):
-    return file_handler.read(32)[::-1]
-
-
-def write_block_hash_file(file_handler, block_hash_bin):
-    file_handler.write(block_hash_bin[::-1])
-
-
-def read_num_chunks_file(file_handler):
-    return base.read_int_file(file_handler)
-
-
-def write_num_chunks_file(file_handler, num_chunks):
-    base.write_int_file(file_handler, num_chunks)
-
-
-def read_snapshot_file(file_handler):
-    snapshot_height = read_snapshot_height_file(file_handler)
-    block_hash = read_block_hash_file(file_handler)
-    num_chunks = read_num_chunks_file(file_handler)
-
-    return (snapshot_height, block_hash, num_chunks)
-
-
-def write_snapshot_file(file_handler, snapshot_height, block_hash, num_chunks):
-    write_snapshot_height_file(file_handler, snapshot_height)
-    write_block_hash_file(file_handler, block_hash)
-    write_num_chunks_file(file_handler, num_chunks)
+# The state file helpers live in lib/state.py, such that lib modules do not depend on this script
+from lib.state import (
+    read_snapshot_height_file, write_snapshot_height_file, read_block_hash_file, write_block_hash_file,
+    read_num_chunks_file, write_num_chunks_file, read_snapshot_file, write_snapshot_file)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+""" This script selects the UTXOs of a snapshot by creation height and script type.
+
+    Only chunks that may hold matching UTXOs according to the zone map (see build_zone_map.py) are parsed. Without
+    any filter, the histogram of script types is answered from the zone map alone. """
+
+import sys
+import argparse
+
+import numpy as np
+
+from parse_snapshot import iter_snapshot
+from lib import zonemap
+from lib import utxo as utxo_handler
+
+
+if __name__ == '__main__':
+    labels = {v[0]: k for k, v in utxo_handler.scripttype_labels.items()}
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to query')
+    argparser.add_argument('--min-height', type=int, help='Minimum block height UTXOs were created at', default=None)
+    argparser.add_argument('--max-height', type=int, help='Maximum block height UTXOs were created at', default=None)
+    argparser.add_argument('--script-type', type=str, action='append', choices=sorted(labels.keys()), help='Script type of UTXOs (may be repeated)', default=None)
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are analysing an obfuscated snapshot')
+    argparser.add_argument('--list', action='store_true', help='Print all matching UTXOs as CSV')
+    args = argparser.parse_args()
+
+    try:
+        zone_map = zonemap.read_zone_map(zonemap.get_zone_map_filename(args.folder, args.snapshot_height), is_obfuscated_snapshot=args.obfuscated_snapshot)
+    except ValueError as e:
+        argparser.error(str(e))
+    script_types = [labels[t] for t in args.script_type] if args.script_type is not None else None
+
+    if args.min_height is None and args.max_height is None and script_types is None and not args.list:
+        histogram = dict(zip(zonemap.SCRIPT_TYPES, zone_map['script_types'].sum(axis=0).tolist()))
+        utxo_handler.print_utxo_histogram({k: v for k, v in histogram.items() if v}, args.snapshot_height, None)
+        sys.exit(0)
+
+    mask = zonemap.select_chunks(zone_map, min_height=args.min_height, max_height=args.max_height, script_types=script_types)
+    filenames = [f'{args.folder}/chunks/{f.decode()}' for f in zone_map['filename'][mask]]
+
+    if args.list:
+        print('txid;tx_index;block_height;is_coinbase;value;script_type')
+    num_utxos = 0
+    total_value = 0
+    for _, _, _, utxos in iter_snapshot(args.folder, args.snapshot_height, is_obfuscated_snapshot=args.obfuscated_snapshot, filenames=filenames):
+        types = utxo_handler.classify_compressed_scripts(utxos.scripts, utxos.script_offsets, is_obfuscated_snapshot=args.obfuscated_snapshot)
+        matches = np.ones(len(utxos), dtype=bool)
+        if args.min_height is not None:
+            matches &= utxos.height >= args.min_height
+        if args.max_height is not None:
+            matches &= utxos.height <= args.max_height
+        if script_types is not None:
+            matches &= np.isin(types, script_types)
+
+        num_utxos += int(matches.sum())
+        total_value += sum(utxos.value[matches].tolist())
+        if args.list:
+            for i in np.flatnonzero(matches):
+                outpoint, coin = utxos[i]
+                label = utxo_handler.scripttype_labels[utxo_handler.ScriptType(types[i])][0]
+                print(f'{utxo_handler.get_txid_hex(outpoint[0])};{outpoint[1]};{coin[0]};{coin[2]};{coin[1][1]};{label}')
+
+    print(f'Chunks parsed: {len(filenames)} of {len(zone_map)}', file=sys.stderr)
+    print(f'Matching UTXOs: {num_utxos}', file=sys.stderr)
+    print(f'Total value: {total_value}', file=sys.stderr)
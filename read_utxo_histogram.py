@@ -19,12 +19,12 @@ if __name__ == '__main__':
     res = dict()
     res['chunk_height'] = args.snapshot_height
     for column in data:
-        if column in ['chunk_height', 'chunk_offset']:
+        if column in ['chunk_height', 'chunk_offset', 'chunk_hash']:
             continue
         res[column] = data[column].sum()
 
     data_out = pd.DataFrame(res, index=['absolute']).drop('chunk_height', axis=1).transpose()
-    total_utxos = data_out.sum(axis=0)[0]
+    total_utxos = data_out.sum(axis=0).iloc[0]
     print(str(total_utxos))
     data_out['relative'] = (100. * data_out['absolute']) / (1. * total_utxos)
     print(str(data_out))
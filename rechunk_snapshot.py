@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" This script rewrites a snapshot with a different maximum chunk size.
+
+    The serialized UTXOs are copied as raw byte ranges, as found by utxo.get_utxo_offsets, such that neither scripts
+    nor values are decoded. The order of all UTXOs is kept. """
+
+import os
+import argparse
+
+import progressbar
+
+from parse_snapshot import get_state_filename, get_chunk_filenames, read_chunk_files
+from parse_state_file import read_snapshot_file
+from lib import chunk
+from lib import utxo as utxo_handler
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding the state file and all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to rechunk')
+    argparser.add_argument('target_folder', type=str, help='Folder to write the rechunked snapshot to')
+    argparser.add_argument('--max-size', type=int, help='Maximum size of the new chunks in bytes', default=chunk.MAX_SIZE_CHUNK)
+    argparser.add_argument('--obfuscated-snapshot', action='store_true', help='Use if you are rechunking an obfuscated snapshot')
+    argparser.add_argument('--overwrite', action='store_true', help='Replace a snapshot of the same height in target_folder')
+    args = argparser.parse_args()
+
+    # Chunks of the source would be overwritten before they are read
+    if os.path.realpath(args.folder) == os.path.realpath(args.target_folder):
+        argparser.error('target_folder must differ from folder')
+
+    with open(get_state_filename(args.folder, args.snapshot_height), 'rb') as f:
+        state_height, block_hash, state_num_chunks = read_snapshot_file(f)
+
+    filenames = get_chunk_filenames(args.folder, args.snapshot_height)
+    try:
+        writer = chunk.ChunkWriter(args.target_folder, state_height, max_size=args.max_size, overwrite=args.overwrite)
+    except FileExistsError as e:
+        argparser.error(f'{e}, use --overwrite to replace it')
+    bar = progressbar.ProgressBar(max_value=len(filenames), redirect_stdout=True)
+    for i, (_, data) in enumerate(read_chunk_files(filenames)):
+        chunk_num_utxos, offset = chunk.read_num_utxos(data)
+        offsets = utxo_handler.get_utxo_offsets(data, offset, chunk_num_utxos, is_obfuscated_snapshot=args.obfuscated_snapshot).tolist()
+        buffer = memoryview(data)
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            writer.add(buffer[start:end])
+        bar.update(i)
+    num_chunks = writer.close(block_hash)
+
+    print('Number chunks: {} -> {}'.format(state_num_chunks, num_chunks))
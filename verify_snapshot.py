@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" This script checks the integrity of a whole snapshot and prints a JSON report of all detected mismatches.
+
+    Namely, it checks that the number of chunk files matches the state file, that all chunk headers carry the
+    snapshot height, that the chunk offsets are contiguous, and that no chunk exceeds the maximum chunk size (which is
+    MAX_SIZE_CHUNK unless --max-size is given, e.g., for snapshots written by rechunk_snapshot.py). The
+    double-SHA256 of every chunk is computed on a thread pool, as hashlib releases the GIL while hashing. """
+
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+from binascii import hexlify
+from concurrent.futures import ThreadPoolExecutor
+
+from lib import chunk
+from parse_state_file import read_snapshot_file
+from parse_snapshot import get_state_filename, get_chunk_filenames
+
+
+def get_chunk_info(chunk_filename):
+    data = chunk.read_chunk_file(chunk_filename)
+    return {
+        'filename': chunk_filename,
+        'chunk_height': chunk.read_chunk_height(data),
+        'chunk_offset': chunk.read_chunk_offset(data),
+        'chunk_size': len(data),
+        'chunk_hash': chunk.get_chunk_hash(data),
+    }
+
+
+def verify_snapshot(folder, snapshot_height, jobs=None, max_size=chunk.MAX_SIZE_CHUNK):
+    with open(get_state_filename(folder, snapshot_height), 'rb') as f:
+        state_height, block_hash, num_chunks = read_snapshot_file(f)
+
+    filenames = get_chunk_filenames(folder, snapshot_height)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        chunks = list(executor.map(get_chunk_info, filenames))
+
+    mismatches = list()
+    if state_height != snapshot_height:
+        mismatches.append({'type': 'state_height', 'expected': snapshot_height, 'actual': state_height})
+    if len(chunks) != num_chunks:
+        mismatches.append({'type': 'num_chunks', 'expected': num_chunks, 'actual': len(chunks)})
+
+    for c in chunks:
+        if c['chunk_height'] != snapshot_height:
+            mismatches.append({'type': 'chunk_height', 'filename': c['filename'], 'expected': snapshot_height, 'actual': c['chunk_height']})
+        if c['chunk_size'] > max_size:
+            mismatches.append({'type': 'chunk_size', 'filename': c['filename'], 'expected': max_size, 'actual': c['chunk_size']})
+
+    # Offsets have to cover 0, ..., num_chunks - 1 exactly once
+    offsets = Counter(c['chunk_offset'] for c in chunks)
+    duplicate_offsets = sorted(o for o, count in offsets.items() if count > 1)
+    missing_offsets = sorted(set(range(num_chunks)) - offsets.keys())
+    unexpected_offsets = sorted(offsets.keys() - set(range(num_chunks)))
+    if duplicate_offsets:
+        mismatches.append({'type': 'duplicate_chunk_offsets', 'offsets': duplicate_offsets})
+    if missing_offsets:
+        mismatches.append({'type': 'missing_chunk_offsets', 'offsets': missing_offsets})
+    if unexpected_offsets:
+        mismatches.append({'type': 'unexpected_chunk_offsets', 'offsets': unexpected_offsets})
+
+    return {
+        'snapshot_height': snapshot_height,
+        'block_hash': hexlify(block_hash).decode(),
+        'num_chunks': num_chunks,
+        'chunks': chunks,
+        'mismatches': mismatches,
+    }
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('folder', type=str, help='Folder holding the state file and all snapshot chunks')
+    argparser.add_argument('snapshot_height', type=int, help='Block height of the snapshot to verify')
+    argparser.add_argument('--jobs', type=int, help='Number of threads hashing chunks in parallel', default=os.cpu_count())
+    argparser.add_argument('--chunks', action='store_true', help='Include all chunk headers and hashes in the report')
+    argparser.add_argument('--max-size', type=int, help='Maximum size of the chunks in bytes', default=chunk.MAX_SIZE_CHUNK)
+    args = argparser.parse_args()
+
+    report = verify_snapshot(args.folder, args.snapshot_height, jobs=args.jobs, max_size=args.max_size)
+    if not args.chunks:
+        del report['chunks']
+    print(json.dumps(report, indent=2))
+
+    sys.exit(1 if report['mismatches'] else 0)